@@ -1,3 +1,4 @@
+import os
 from typing import Optional
 
 class Config:
@@ -10,6 +11,7 @@ class Config:
     
     # Vector Store Configuration
     CHROMA_PERSIST_DIR = "data/index"
+    KEYWORD_INDEX_PATH = "data/bm25/default.pkl"  # BM25 corpus statistics for the default namespace
     COLLECTION_NAME = "pdf_collection"
     
     # Pinecone Configuration
@@ -17,11 +19,36 @@ class Config:
     PINECONE_ENVIRONMENT = "aped-4627-b74a"  # From your URL
     PINECONE_INDEX_NAME = "rag-assignment-setup"  # From your URL
     PINECONE_HOST = "https://rag-assignment-setup-3kcgbjt.svc.aped-4627-b74a.pinecone.io"
+    PINECONE_UPSERT_BATCH_SIZE = 100  # Vectors per upsert request
+    PINECONE_UPSERT_CONCURRENCY = 16  # Upsert requests in flight at once
     
     # Embedding Dimensions
     EMBEDDING_DIMENSION = 768  # Google's embedding dimension
     GOOGLE_EMBEDDING_MODEL = "models/embedding-001"
     GOOGLE_LLM_MODEL = "gemini-2.0-flash"
+    EMBEDDING_BATCH_SIZE = 100  # Google's max texts per batch embedding request
+    EMBEDDING_CONCURRENCY = 8  # Concurrent batch embedding requests during upload
+    EMBEDDING_CACHE_MAX_ENTRIES = 40000  # Chunk embeddings kept in memory (float16), keyed by content hash
+    EMBEDDING_DISK_CACHE_PATH = "data/cache/embeddings.sqlite3"  # Chunk embeddings persisted across restarts
+    EMBEDDING_DISK_CACHE_MAX_ENTRIES = 500000  # Oldest persisted embeddings beyond this are dropped (~1.5KB each)
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 1024  # Query embeddings kept in memory, keyed by query text
+
+    # Retrieval Configuration
+    RETRIEVAL_TOP_K = 3  # Nearest chunks fetched from Pinecone per query; more raises recall and latency
+    RETRIEVAL_MIN_SCORE = 0.7  # Matches below this similarity are kept only if they share keywords with the query
+
+    # LLM Configuration
+    LLM_CONCURRENCY = 16  # Gemini calls in flight at once; further requests wait their turn
+    LLM_MAX_RETRIES = 6  # Attempts per Gemini call on rate-limit or server errors (library default)
+
+    # Chat Memory Configuration
+    MAX_CHAT_SESSIONS = 1024  # Least recently used sessions beyond this are evicted
+    CHAT_SESSION_TTL = 3600  # Seconds an idle session's memory is kept
+
+    # Semantic Response Cache Configuration
+    SEMANTIC_CACHE_THRESHOLD = 0.95  # Minimum cosine similarity for a cache hit
+    SEMANTIC_CACHE_TTL = 3600  # Seconds before a cached answer expires
+    SEMANTIC_CACHE_MAX_ENTRIES = 1024
 
     AWS_DEFAULT_REGION="ap-south-1"
     S3_BUCKET_NAME="my-rag-bucket-assignment"
@@ -29,5 +56,17 @@ class Config:
     S3_CHROMA_PREFIX= "chroma/"  
     
     # Document Processing Configuration
-    CHUNK_SIZE = 500  # Default chunk size in characters
-    CHUNK_OVERLAP = 200  # Default chunk overlap in characters
\ No newline at end of file
+    CHUNK_SIZE = 400  # Default chunk size in tokens
+    CHUNK_OVERLAP = 0  # Default chunk overlap in tokens (none works best for recursive splitting)
+    MIN_CHUNK_TOKENS = 50  # Shorter chunks are merged into the preceding chunk of the same page
+    MIN_TEXT_CHARS = 20  # Pages and chunks with less text than this are not embedded
+    CHUNK_TOKEN_ENCODING = "cl100k_base"  # tiktoken encoding used to count chunk tokens
+    PDF_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Parser processes; one core is left for the event loop
+    PDF_PAGES_PER_TASK = 50  # Longer PDFs are parsed as page ranges spread over the parser processes
+    CHUNK_CACHE_DIR = "data/cache/chunks"  # Parsed chunks keyed by PDF content hash and chunk settings
+    CHUNK_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used cache files are evicted beyond this
+    MAX_IN_MEMORY_PDF_BYTES = 500 * 1024 * 1024  # Larger PDFs are parsed from disk instead of memory
+
+    # Upload Configuration
+    UPLOAD_CONCURRENCY = 8  # Files ingested concurrently per upload request
+    MAX_UPLOAD_REQUEST_BYTES = 200 * 1024 * 1024  # Larger upload requests are rejected before parsing
@@ -1,11 +1,21 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
 from app.routes import upload
-from app.utils.logger import configure_logger
+from app.utils.logger import configure_logger, configure_worker_logger, start_worker_logging
 from app.routes import chat
 from app.utils.cleanup import cleanup_all_data
 from app.utils.aws_secrets import load_secrets_with_fallback
+from app.services.pinecone_store import aquery, get_vector_store
+from app.services.embedding import get_embedder
+from app.services.keyword_index import keyword_index
+from app.services.pdf_loader import load_token_encoding
+from app.config import Config
+import asyncio
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 configure_logger()
@@ -13,7 +23,34 @@ configure_logger()
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="PDF RAG Chatbot")
+app = FastAPI(title="PDF RAG Chatbot", default_response_class=ORJSONResponse)
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads from Content-Length before the multipart body is read.
+
+    A plain ASGI middleware rather than @app.middleware("http"): every other
+    request, including streamed chat responses, is passed straight through
+    instead of being wrapped by BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/api/upload":
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > Config.MAX_UPLOAD_REQUEST_BYTES:
+                logger.warning("Rejected upload of %s bytes", content_length)
+                response = ORJSONResponse(
+                    status_code=413,
+                    content={"detail": f"Upload exceeds {Config.MAX_UPLOAD_REQUEST_BYTES} bytes"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # Include routes
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
@@ -31,20 +68,70 @@ async def startup_event():
         else:
             logger.info("Application will use local environment variables for configuration")
     except Exception as e:
-        logger.warning(f"Error during secrets loading: {str(e)}")
+        logger.warning("Error during secrets loading: %s", e)
         logger.info("Application will use local environment variables for configuration")
 
+    # Process pool for CPU-bound PDF parsing and chunking during uploads. Workers
+    # come from a forkserver rather than fork(): forking a process that already
+    # runs the event loop, gRPC channels and logging threads can deadlock the child.
+    # Workers log through a multiprocessing queue drained by this process
+    mp_context = multiprocessing.get_context("forkserver")
+    app.state.pdf_pool = ProcessPoolExecutor(
+        max_workers=Config.PDF_WORKERS,
+        mp_context=mp_context,
+        initializer=configure_worker_logger,
+        initargs=(start_worker_logging(mp_context),)
+    )
+
+    # Load the chunking token encoding before the first upload; tiktoken keeps the
+    # downloaded file in its disk cache, where the pool workers find it
+    await asyncio.to_thread(load_token_encoding)
+
+    # Build the Pinecone Index handle once so request handlers can reuse it
+    try:
+        app.state.pinecone_index = get_vector_store().get_query_index()
+        logger.info("Pinecone index handle registered")
+    except Exception as e:
+        logger.warning("Failed to initialize Pinecone index handle: %s", e)
+
+    # Restore BM25 statistics for vectors that are still in Pinecone
+    try:
+        keyword_index.load(Config.KEYWORD_INDEX_PATH)
+    except Exception as e:
+        logger.warning("Failed to load keyword index: %s", e)
+
+    # Pre-warm the embedding and Pinecone connections so the first chat
+    # request does not pay for TLS handshakes and auth. Without an index handle
+    # (Pinecone unreachable above) only the embedding connection is warmed; the
+    # first chat request retries the handle
+    try:
+        chat.get_llm()
+        warmup_embedding = await get_embedder().aembed_query("warmup")
+        pinecone_index = getattr(app.state, "pinecone_index", None)
+        if pinecone_index is None:
+            logger.info("Embedding connection pre-warmed; no Pinecone index handle to pre-warm")
+        else:
+            await aquery(
+                pinecone_index,
+                vector=warmup_embedding,
+                top_k=1,
+                namespace="default"
+            )
+            logger.info("Embedding and Pinecone connections pre-warmed")
+    except Exception as e:
+        logger.warning("Connection pre-warm failed: %s", e)
+
     try:
         logger.info("Performing startup cleanup for fresh instance...")
         cleanup_all_data()
         logger.info("Startup cleanup completed successfully")
     except Exception as e:
-        logger.warning(f"Startup cleanup failed: {str(e)}")
+        logger.warning("Startup cleanup failed: %s", e)
 
     logger.info("PDF RAG Chatbot initialized successfully")
     logger.info("Routes loaded and ready to serve")
-    logger.info(f"Log files will be saved to: logs/")
-    logger.info(f"Log level: DEBUG (file), INFO (console)")
+    logger.info("Log files will be saved to: logs/")
+    logger.info("Log level: DEBUG (file), INFO (console)")
 
     # Log important environment variables
     google_api_key = os.getenv("GOOGLE_API_KEY")
@@ -53,13 +140,14 @@ async def startup_event():
     else:
         logger.warning("Google API key is not configured - embedding features will not work")
 
-    logger.info(f"Working directory: {os.getcwd()}")
-    logger.info(f"Upload directory: data/uploads")
-    logger.info(f"Vector store: Pinecone (rag-assignment-setup)")
+    logger.info("Working directory: %s", os.getcwd())
+    logger.info("Upload directory: data/uploads")
+    logger.info("Vector store: Pinecone (rag-assignment-setup)")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("FastAPI application shutting down...")
+    app.state.pdf_pool.shutdown(cancel_futures=True)
 
 @app.get("/health")
 def health_check():
@@ -72,6 +160,24 @@ def welcome():
     logger.debug("Server is running")
     return {"Server": "Running"}
 
+def _count_uploaded_pdfs(upload_dir: str) -> int:
+    """Count PDF files in the upload directory."""
+    try:
+        with os.scandir(upload_dir) as entries:
+            return sum(1 for entry in entries if entry.name.endswith('.pdf') and entry.is_file(follow_symlinks=False))
+    except:
+        return 0
+
+
+def _get_pinecone_stats():
+    """Fetch Pinecone index stats, returning (status, vector_count)."""
+    try:
+        stats = get_vector_store().get_stats()
+        return "connected", stats.get('total_vector_count', 0)
+    except Exception as e:
+        return f"error: {str(e)}", 0
+
+
 @app.get("/status")
 async def status_endpoint():
     """
@@ -83,24 +189,13 @@ async def status_endpoint():
         # Check if directories exist and count files
         upload_exists = os.path.exists(upload_dir)
         
+        # Run the blocking filesystem scan and Pinecone call off the event loop
         upload_count = 0
         if upload_exists:
-            try:
-                upload_count = len([f for f in os.listdir(upload_dir) if f.endswith('.pdf')])
-            except:
-                upload_count = 0
+            upload_count = await asyncio.to_thread(_count_uploaded_pdfs, upload_dir)
         
         # Check Pinecone connection
-        pinecone_status = "unknown"
-        try:
-            from app.services.pinecone_store import PineconeVectorStoreHandler
-            vs_handler = PineconeVectorStoreHandler()
-            stats = vs_handler.get_stats()
-            pinecone_status = "connected"
-            pinecone_vector_count = stats.get('total_vector_count', 0)
-        except Exception as e:
-            pinecone_status = f"error: {str(e)}"
-            pinecone_vector_count = 0
+        pinecone_status, pinecone_vector_count = await asyncio.to_thread(_get_pinecone_stats)
         
         return {
             "status": "success",
@@ -120,12 +215,9 @@ async def status_endpoint():
         }
         
     except Exception as e:
-        logger.error(f"Status check failed: {str(e)}")
+        logger.error("Status check failed: %s", e)
         return {
             "status": "error",
             "message": "Status check failed",
             "details": str(e)
         }
-
-
-
@@ -5,6 +5,7 @@ from typing import List, Optional
 class ChatRequest(BaseModel):
     query: str
     session_id: str = "default"  # Session ID for memory management
+    include_sources: bool = True  # False returns only the answer, without source excerpts
 
 
 class Source(BaseModel):
@@ -28,6 +29,17 @@ class DeleteResponse(BaseModel):
     s3_key: str
     success: bool
 
+class BatchDeleteRequest(BaseModel):
+    """Request model for deleting several files at once."""
+    s3_keys: List[str]  # The S3 keys of the files to delete
+
+class BatchDeleteResponse(BaseModel):
+    """Response model for batch delete operations."""
+    message: str
+    deleted_files: List[str]
+    s3_keys: List[str]
+    success: bool
+
 class ResetRequest(BaseModel):
     """Request model for resetting the entire index."""
     confirm: bool = False  # Safety flag to confirm reset operation
@@ -1,20 +1,25 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
 import os
-import pinecone
+import time
 import logging
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
-from app.services.pinecone_store import PineconeVectorStoreHandler
 
-from app.services.embedding import EmbeddingModel
+from app.services.embedding import get_embedder
+from app.services.pinecone_store import aquery, get_vector_store
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
-from langchain.schema.output_parser import StrOutputParser
 from app.models.models import ChatRequest, Source, ChatResponse
+from app.config import Config
+from app.services.keyword_index import keyword_index
+from app.services.semantic_cache import semantic_cache
+from app.services.memory import Memory
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -22,130 +27,344 @@ router = APIRouter()
 
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+@lru_cache(maxsize=1)
+def get_llm() -> ChatGoogleGenerativeAI:
+    """
+    Get the shared Gemini chat client, created on first use so the API key
+    is read after startup has loaded secrets. All requests reuse its channel.
+    """
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        max_retries=Config.LLM_MAX_RETRIES  # retried with exponential backoff on rate limits and server errors
+    )
+
+# Caps concurrent Gemini calls so traffic bursts queue here instead of
+# tripping the API's rate limit and burning through retries
+llm_semaphore = asyncio.Semaphore(Config.LLM_CONCURRENCY)
+
+NO_RESULTS_ANSWER = "I could not find any relevant information in the uploaded documents."
+
+# Reciprocal rank fusion constant for combining keyword and semantic ranks
+RRF_K = 60
 
-vs_handler = PineconeVectorStoreHandler()
+# Session memories; idle sessions expire after CHAT_SESSION_TTL and the least
+# recently used session is evicted once MAX_CHAT_SESSIONS is exceeded
+memory_store = Memory(maxsize=Config.MAX_CHAT_SESSIONS, ttl=Config.CHAT_SESSION_TTL)
 
-memory_store = {}
+def get_memory(session_id: str) -> deque:
+    """Get or create memory for a session as a ring buffer of (question, answer) pairs"""
+    memory = memory_store.retrieve(session_id, None)
+    if memory is None:
+        memory = deque(maxlen=5)  # Keep last 5 interactions
+    # Store on every access so an active session's expiry is pushed back
+    memory_store.store(session_id, memory)
+    return memory
 
-def get_memory(session_id: str):
-    """Get or create memory for a session"""
-    if session_id not in memory_store:
-        memory_store[session_id] = ConversationBufferWindowMemory(
-            k=5,  # Keep last 5 interactions
-            return_messages=True
-        )
-    return memory_store[session_id]
 
-# Custom RAG prompt template
-RAG_PROMPT = PromptTemplate(
-    input_variables=["context", "chat_history", "question"],
-    template="""
+def format_chat_history(memory: deque) -> str:
+    """Render the session memory as Human/AI lines for the prompt"""
+    return "\n".join(f"Human: {question}\nAI: {answer}" for question, answer in memory)
+
+
+# Constant pieces of the RAG prompt, joined per request with the dynamic parts
+PROMPT_HEAD = """
     You are a helpful assistant that answers questions based on the provided context from PDF documents.
     Maintain context from the conversation history when relevant.
 
     Context from documents:
-    {context}
+    """
+PROMPT_HISTORY = """
 
     Conversation History:
-    {chat_history}
+    """
+PROMPT_QUESTION = """
 
-    Current Question: {question}
+    Current Question: """
+PROMPT_TAIL = """
 
     Answer based on the context. If the answer cannot be found in the context, say "I don't know based on the available documents".
     """
-)
+CONTEXT_SEPARATOR = "\n\n"
+
+def build_rag_prompt(contexts: list[str], chat_history: str, question: str) -> str:
+    """Assemble the RAG prompt in a single join without an intermediate context string"""
+    parts = [PROMPT_HEAD]
+    for i, context in enumerate(contexts):
+        if i:
+            parts.append(CONTEXT_SEPARATOR)
+        parts.append(context)
+    parts.extend((PROMPT_HISTORY, chat_history, PROMPT_QUESTION, question, PROMPT_TAIL))
+    return "".join(parts)
+
+
+def _json_response(chat_response: ChatResponse) -> Response:
+    """
+    Serialize a ChatResponse once with pydantic-core.
+
+    Returning a Response skips FastAPI's re-validation and re-encoding of the
+    model against response_model, which is kept only for the OpenAPI schema.
+    """
+    return Response(content=chat_response.model_dump_json(), media_type="application/json")
+
+
+def _sse_event(payload: dict) -> bytes:
+    """Encode a payload as a server-sent event"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _make_source(metadata: dict) -> Source:
+    """Build a citation from stored chunk metadata; file names were normalized at upload."""
+    return Source(
+        pdf_name=metadata.get("file_name", "Unknown"),
+        page_number=metadata.get("page_number", None),
+        relevant_text=metadata.get("text", None)
+    )
+
+
+async def retrieve_context(query_text: str, query_embedding: List[float], index) -> Optional[Tuple[List[str], List[Source]]]:
+    """
+    Search Pinecone with the query embedding and select the relevant context.
+
+    Returns the retrieved context texts and the most relevant source, or None
+    when Pinecone returns no matches at all.
+    """
+    # 2. Search Pinecone for similar docs without blocking the event loop
+    search_results = await aquery(
+        index,
+        vector=query_embedding,
+        top_k=Config.RETRIEVAL_TOP_K,
+        include_metadata=True,
+        namespace="default"
+    )
+
+    if not search_results.matches:
+        return None
+
+    # 3. Score matches with BM25 and collect retrieved context and source information
+    text_matches = [match for match in search_results.matches if "text" in match.metadata]
+    bm25_scores = keyword_index.score(query_text, [match.metadata["text"] for match in text_matches])
+
+    # Pinecone returns matches in similarity order; rank them by BM25 as well
+    bm25_ranks = [0] * len(text_matches)
+    for rank, i in enumerate(sorted(range(len(text_matches)), key=bm25_scores.__getitem__, reverse=True)):
+        bm25_ranks[i] = rank
+
+    # One pass over the matches: keep those whose keywords match or whose
+    # similarity is high, and track the best by reciprocal rank fusion of the
+    # keyword and semantic rankings (a Source is only built for that match)
+    retrieved_contexts = []
+    best_match, best_score = None, 0.0
+    for i, match in enumerate(text_matches):
+        if bm25_scores[i] > 0 or match.score > Config.RETRIEVAL_MIN_SCORE:
+            retrieved_contexts.append(match.metadata["text"])
+            fused_score = 1 / (RRF_K + bm25_ranks[i]) + 1 / (RRF_K + i)
+            if fused_score > best_score:
+                best_match, best_score = match, fused_score
+
+    sources = [_make_source(best_match.metadata)] if best_match is not None else []
+    return retrieved_contexts, sources
+
+
+# Futures of history-free chats currently being answered, keyed by normalized query
+inflight_chats: Dict[str, asyncio.Future] = {}
+
+
+def _query_key(query_text: str) -> str:
+    """Key identical queries regardless of case and surrounding whitespace."""
+    return hashlib.blake2b(" ".join(query_text.lower().split()).encode("utf-8"), digest_size=16).hexdigest()
+
+
+async def _single_flight(key: str, produce: Callable[[], Awaitable[ChatResponse]]) -> ChatResponse:
+    """
+    Run produce() once per key; concurrent callers with the same key await
+    the first caller's result instead of running the pipeline again.
+
+    If the leading caller is cancelled (e.g. its client disconnected), its
+    waiters are not: the first of them to wake becomes the new leader and
+    the rest join it.
+    """
+    while True:
+        future = inflight_chats.get(key)
+        if future is None:
+            break
+        logger.debug("Joining in-flight chat for key: %s", key)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Only the leader's cancellation is retried; our own is propagated
+            if not future.cancelled() or asyncio.current_task().cancelling():
+                raise
+            logger.debug("In-flight chat leader was cancelled, retrying key: %s", key)
+
+    future = asyncio.get_running_loop().create_future()
+    inflight_chats[key] = future
+    try:
+        result = await produce()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        del inflight_chats[key]
+
+
+async def answer_query(query_text: str, chat_history: str, index, cacheable: bool) -> ChatResponse:
+    """Embed, retrieve and generate an answer, using the semantic cache when allowed."""
+    # 1. Embed query using your wrapper
+    query_embedding = await get_embedder().aembed_query(query_text)
+
+    if cacheable:
+        cached = semantic_cache.get(query_embedding)
+        if cached is not None:
+            logger.info("Semantic cache hit for query: %s", query_text)
+            return cached
+
+    retrieved = await retrieve_context(query_text, query_embedding, index)
+    if retrieved is None:
+        return ChatResponse(answer=NO_RESULTS_ANSWER, sources=[])
+
+    retrieved_contexts, sources = retrieved
+
+    # 4. Call the LLM directly with the assembled prompt
+    prompt = build_rag_prompt(retrieved_contexts, chat_history, query_text)
+    async with llm_semaphore:
+        response = (await get_llm().ainvoke(prompt)).content
+
+    chat_response = ChatResponse(answer=response, sources=sources)
+    if cacheable:
+        semantic_cache.put(query_embedding, chat_response)
+    return chat_response
+
+
+async def _get_pinecone_index(app):
+    """
+    The Pinecone query index handle registered at startup. If startup could
+    not reach Pinecone, build it now (off the event loop) and register it, so
+    requests recover once Pinecone is reachable instead of failing until restart.
+    """
+    index = getattr(app.state, "pinecone_index", None)
+    if index is None:
+        logger.info("Pinecone index handle missing, creating it")
+        index = await asyncio.to_thread(lambda: get_vector_store().get_query_index())
+        app.state.pinecone_index = index
+    return index
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     try:
         query_text = request.query
         session_id = request.session_id
-        logger.info(f"Received chat query: {query_text} for session: {session_id}")
+        logger.info("Received chat query: %s for session: %s", query_text, session_id)
 
         # Get or create memory for this session
         memory = get_memory(session_id)
+        index = await _get_pinecone_index(http_request.app)
 
-        # 1. Embed query using your wrapper
-        embedder = EmbeddingModel(api_key=os.getenv("GOOGLE_API_KEY"))
-        query_embedding = embedder.embed_query(query_text)
-
-        # 2. Search Pinecone for similar docs
-        search_results = vs_handler.pc.Index(vs_handler.index_name).query(
-            vector=query_embedding,
-            top_k=3,
-            include_metadata=True,
-            namespace="default"
-        )
-
-        if not search_results.matches:
-            # Even with no context, save to memory
-            memory.save_context({"input": query_text}, {"output": "I could not find any relevant information in the uploaded documents."})
-            return ChatResponse(answer="I could not find any relevant information in the uploaded documents.", sources=[])
-
-        # 3. Collect retrieved context and source information
-        retrieved_contexts = []
-        sources = []
-
-        # Get similarity scores to filter most relevant matches
-        for match in search_results.matches:
-            if "text" in match.metadata:
-                # Check if the text actually contains relevant information
-                text = match.metadata.get("text", "").lower()
-                query_keywords = query_text.lower().split()
-
-                # Calculate relevance score based on keyword presence and similarity score
-                keyword_matches = sum(1 for keyword in query_keywords if keyword in text)
-                if keyword_matches > 0 or match.score > 0.7:  # Only include if keywords match or high similarity
-                    retrieved_contexts.append(match.metadata["text"])
-                    sources.append(Source(
-                        pdf_name=match.metadata.get("file_name", "Unknown"),
-                        page_number=match.metadata.get("page_number", None),
-                        relevant_text=match.metadata.get("text", None)
-                    ))
-
-        # Sort sources by relevance (most relevant first)
-        sources = sorted(sources, key=lambda x: len([kw for kw in query_text.lower().split() if kw in x.relevant_text.lower()]), reverse=True)
-
-        # Take only the most relevant source
-        sources = sources[:1] if sources else []
-
-        context_str = "\n\n".join(retrieved_contexts)
-
-        # 4. Use LangChain's LLMChain with memory (fallback to older approach if needed)
-        try:
-            # Try newer Runnable approach first
-            chain = (
-                {
-                    "context": lambda x: context_str,
-                    "chat_history": lambda x: memory.buffer_as_str if hasattr(memory, 'buffer_as_str') else "No chat history",
-                    "question": RunnablePassthrough()
-                }
-                | RAG_PROMPT
-                | llm
-                | StrOutputParser()
-            )
-            response = chain.invoke(query_text)
-        except Exception as chain_error:
-            # Fallback to older LLMChain approach
-            logger.warning(f"New chain approach failed: {chain_error}, falling back to LLMChain")
-            chain = LLMChain(
-                llm=llm,
-                prompt=RAG_PROMPT,
-                memory=memory,
-                verbose=False
-            )
-            response = chain.run(
-                context=context_str,
-                question=query_text
+        if memory:
+            # Answers that depend on conversation history are never cached or shared
+            chat_response = await answer_query(query_text, format_chat_history(memory), index, cacheable=False)
+        else:
+            # Identical history-free queries arriving together share one pipeline run
+            chat_response = await _single_flight(
+                _query_key(query_text),
+                lambda: answer_query(query_text, "", index, cacheable=True)
             )
 
-        return ChatResponse(answer=response, sources=sources)
+        # Even with no context, save to memory
+        memory.append((query_text, chat_response.answer))
+        if not request.include_sources:
+            # Shared and cached responses keep their sources; only this reply omits them
+            chat_response = chat_response.model_copy(update={"sources": []})
+        return _json_response(chat_response)
 
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
+        logger.error("Error in chat endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Stream the answer as server-sent events.
+
+    Emits {"type": "token"} events as the LLM produces text, then a final
+    {"type": "sources"} event with the total processing time (or
+    {"type": "error"} if generation fails). Sources are left empty when
+    the request sets include_sources to false.
+    """
+    start_time = time.perf_counter()
+    try:
+        query_text = request.query
+        session_id = request.session_id
+        logger.info("Received streaming chat query: %s for session: %s", query_text, session_id)
+
+        memory = get_memory(session_id)
+        query_embedding = await get_embedder().aembed_query(query_text)
+
+        cacheable = not memory
+        cached = semantic_cache.get(query_embedding) if cacheable else None
+        retrieved = None
+        if cached is None:
+            retrieved = await retrieve_context(query_text, query_embedding, await _get_pinecone_index(http_request.app))
+
+    except Exception as e:
+        logger.error("Error in streaming chat endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def sources_event(sources: List[Source]) -> bytes:
+        return _sse_event({
+            "type": "sources",
+            "sources": [source.model_dump() for source in sources] if request.include_sources else [],
+            "processing_time_ms": round((time.perf_counter() - start_time) * 1000)
+        })
+
+    async def event_stream():
+        if cached is not None:
+            logger.info("Semantic cache hit for session: %s", session_id)
+            memory.append((query_text, cached.answer))
+            yield _sse_event({"type": "token", "content": cached.answer})
+            yield sources_event(cached.sources)
+            return
+
+        if retrieved is None:
+            memory.append((query_text, NO_RESULTS_ANSWER))
+            yield _sse_event({"type": "token", "content": NO_RESULTS_ANSWER})
+            yield sources_event([])
+            return
+
+        retrieved_contexts, sources = retrieved
+        chat_history = format_chat_history(memory)
+        prompt = build_rag_prompt(retrieved_contexts, chat_history, query_text)
+
+        answer_parts = []
+        try:
+            async with llm_semaphore:
+                async for chunk in get_llm().astream(prompt):
+                    if chunk.content:
+                        answer_parts.append(chunk.content)
+                        yield _sse_event({"type": "token", "content": chunk.content})
+        except Exception as e:
+            logger.error("Error while streaming chat response: %s", e)
+            yield _sse_event({"type": "error", "detail": str(e)})
+            return
+
+        answer = "".join(answer_parts)
+        memory.append((query_text, answer))
+        if cacheable:
+            semantic_cache.put(query_embedding, ChatResponse(answer=answer, sources=sources))
+        yield sources_event(sources)
+
+    # Disable caching and reverse-proxy buffering so tokens reach the client as they are produced
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,121 +1,177 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
-from app.services.pdf_loader import PDFLoader
-from app.services.embedding import EmbeddingModel
-from app.services.pinecone_store import PineconeVectorStoreHandler
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from typing import List, Tuple
+from app.services.pdf_loader import count_pages, page_ranges, parse_and_chunk
+from app.services.embedding import get_embedder
+from app.services.pinecone_store import get_vector_store
 from app.services.storage.storage import get_storage
+from app.services.keyword_index import keyword_index
+from app.services.semantic_cache import semantic_cache
+from app.utils.file_upload import save_temp_pdf_file
 from app.config import Config
-from app.models.models import DeleteRequest, DeleteResponse, ResetRequest, ResetResponse
+from app.models.models import BatchDeleteRequest, BatchDeleteResponse, DeleteRequest, DeleteResponse, ResetRequest, ResetResponse
 from dotenv import load_dotenv
+import asyncio
 import os
 import logging
-import tempfile
-import shutil
 from datetime import datetime
 
 load_dotenv()
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/upload")
-async def upload_pdfs(files: List[UploadFile] = File(...)):
+# PDF header marker; the spec allows it anywhere in the first 1024 bytes
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
+PDF_CONTENT_TYPES = {"application/pdf", "application/x-pdf", "application/octet-stream"}
+
+
+async def _is_pdf(file: UploadFile) -> bool:
+    """Check the declared content type and the PDF header without reading the whole body."""
+    if file.content_type and file.content_type not in PDF_CONTENT_TYPES:
+        return False
+    head = await file.read(PDF_HEADER_WINDOW)
+    await file.seek(0)
+    return PDF_MAGIC in head
+
+
+async def _parse_pdf(file_path: str, content_hash: str, pdf_pool) -> List[Tuple[str, dict]]:
     """
-    Upload multiple PDFs, process them (extract -> chunk -> embed -> save to pinecone).
-    Files are stored in S3 and metadata is added for differentiation.
+    Parse and chunk a PDF in the process pool. Long documents are split into
+    page ranges parsed in parallel, so one large upload can use every core.
+    Each range task opens the file itself and reuses the caller's content hash.
     """
-    logger.info(f"Starting upload process for {len(files)} files")
+    loop = asyncio.get_running_loop()
+    total_pages = await loop.run_in_executor(pdf_pool, count_pages, file_path)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(
+            pdf_pool, parse_and_chunk, file_path, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, pages, content_hash
+        )
+        for pages in page_ranges(total_pages, Config.PDF_PAGES_PER_TASK)
+    ))
+    return [chunk for part in parts for chunk in part]
 
-    uploaded_files = []
-    all_chunks = []
 
-    try:
-        storage = get_storage()  
-
-        for file in files:
-            if not file.filename.endswith(".pdf"):
-                logger.warning(f"Rejected non-PDF file: {file.filename}")
-                raise HTTPException(status_code=400, detail=f"{file.filename} is not a PDF file")
+async def _ingest_one(file: UploadFile, storage, pdf_pool, semaphore: asyncio.Semaphore) -> Tuple[List[str], List[dict]]:
+    """
+    Save, parse, chunk and upload a single PDF, returning its chunk texts and
+    their metadata as parallel lists.
+    """
+    async with semaphore:
+        # 1. Stream the upload to a temporary file, hashing it as it is written
+        logger.debug("Processing %s locally", file.filename)
+        saved = await save_temp_pdf_file(file)
+        file_path = saved["file_path"]
+        content_hash = saved["content_hash"]
 
-            # 1. Save uploaded file locally first for processing
-            logger.debug(f"Processing {file.filename} locally")
-            
-            # Create a temporary file to save the uploaded content
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                shutil.copyfileobj(file.file, temp_file)
-                temp_file_path = temp_file.name
-            
+        try:
             original_filename = file.filename
-            uploaded_files.append(original_filename)
-            logger.info(f"File saved locally for processing: {original_filename}")
+            logger.info("File saved locally for processing: %s", original_filename)
 
-            # 2. Load PDF -> extract text
-            logger.debug("Loading PDF content")
-            pdf_loader = PDFLoader(temp_file_path)
-            documents = pdf_loader.load()
+            # 2-3. Load PDF and split into chunks in the process pool (CPU-bound)
+            logger.debug("Loading and splitting PDF content")
+            parsed_chunks = await _parse_pdf(file_path, content_hash, pdf_pool)
 
-            if not documents:
-                logger.error(f"No text content found in {original_filename}")
+            if not parsed_chunks:
+                logger.error("No text content found in %s", original_filename)
                 raise HTTPException(status_code=400, detail=f"No text found in {original_filename}")
 
-            # 3. Split into chunks
-            logger.debug("Splitting documents into chunks")
-            chunks = pdf_loader.split(
-                chunk_size=Config.CHUNK_SIZE,
-                chunk_overlap=Config.CHUNK_OVERLAP
-            )
-            logger.info(f"Created {len(chunks)} chunks for {original_filename}")
-            
+            texts = [text for text, _ in parsed_chunks]
+            logger.info("Created %s chunks for %s", len(texts), original_filename)
 
-            # 4. Upload processed file to S3
-            logger.debug(f"Uploading {original_filename} to S3")
-            # Reset file pointer and upload to S3
-            file.file.seek(0)
-            file_info = storage.save_upload(file)
+            # 4. Upload the spooled upload to S3 (sync boto3 client, run off the event loop).
+            # The key comes from the content hash, so re-uploading a file reuses its key and
+            # therefore its vector IDs and keyword-index entry instead of duplicating them
+            logger.debug("Uploading %s to S3", original_filename)
+            file_info = await asyncio.to_thread(storage.save_upload, file, content_hash)
             s3_key = file_info["key"]
-            logger.info(f"File uploaded to S3: s3://{file_info['bucket']}/{s3_key}")
+            logger.info("File uploaded to S3: s3://%s/%s", file_info['bucket'], s3_key)
 
-            # 5. Add metadata (for differentiation)
-            for idx, chunk in enumerate(chunks):
-                chunk.metadata["file_name"] = original_filename
-                chunk.metadata["chunk_id"] = idx
-                chunk.metadata["page_number"] = chunk.metadata.get("page", None)
-                chunk.metadata["s3_key"] = s3_key 
+            # 5. Build the stored metadata. Only fields read back at query time are
+            # kept: loader fields such as the local file path are meaningless once
+            # uploaded, and every key is serialized per vector on upsert and query
+            metadatas = [
+                {
+                    "file_name": original_filename,
+                    "chunk_id": idx,
+                    "page_number": metadata.get("page", None),
+                    "page_label": metadata.get("page_label", None),
+                    "total_pages": metadata.get("total_pages", None),
+                    "s3_key": s3_key
+                }
+                for idx, (_, metadata) in enumerate(parsed_chunks)
+            ]
 
-            all_chunks.extend(chunks)
-            
-            # 6. Clean up temporary file
+            return texts, metadatas
+
+        finally:
+            # 6. Clean up temporary file; the content hash keys the chunk cache, so it need not persist
             try:
-                os.unlink(temp_file_path)
-                logger.debug(f"Cleaned up temporary file: {temp_file_path}")
+                os.unlink(file_path)
+                logger.debug("Cleaned up temporary file: %s", file_path)
             except Exception as e:
-                logger.warning(f"Failed to clean up temporary file {temp_file_path}: {e}")
+                logger.warning("Failed to clean up temporary file %s: %s", file_path, e)
+
+
+@router.post("/upload")
+async def upload_pdfs(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Upload multiple PDFs, process them (extract -> chunk -> embed -> save to pinecone).
+    Files are stored in S3 and metadata is added for differentiation.
+    """
+    logger.info("Starting upload process for %s files", len(files))
 
-        # 7. Initialize embedding model
-        logger.debug("Initializing embedding model")
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        embedder = EmbeddingModel(api_key=google_api_key)
-        logger.info("Embedding model initialized successfully")
+    try:
+        storage = get_storage()  
 
-        # 8. Embed chunks manually
+        # Reject non-PDF files (extension, content type, header bytes) before any of them is processed
+        for file in files:
+            if not file.filename.endswith(".pdf") or not await _is_pdf(file):
+                logger.warning("Rejected non-PDF file: %s", file.filename)
+                raise HTTPException(status_code=400, detail=f"{file.filename} is not a PDF file")
+
+        # Ingest files concurrently so parsing one overlaps S3 uploads of others
+        semaphore = asyncio.Semaphore(Config.UPLOAD_CONCURRENCY)
+        file_chunks = await asyncio.gather(
+            *(_ingest_one(file, storage, request.app.state.pdf_pool, semaphore) for file in files)
+        )
+
+        uploaded_files = [file.filename for file in files]
+        # Keep chunks as parallel lists (texts, metadata, embedding matrix) rather than per-chunk objects
+        texts = [text for file_texts, _ in file_chunks for text in file_texts]
+        metadatas = [metadata for _, file_metadatas in file_chunks for metadata in file_metadatas]
+
+        # 7. Get the shared embedding model
+        embedder = get_embedder()
+
+        # 8. Embed chunks manually into one float32 matrix
         logger.debug("Embedding all chunks before saving to Pinecone")
-        texts = [chunk.page_content for chunk in all_chunks]
-        embeddings = embedder.embed_documents(texts)
+        embeddings = await embedder.aembed_documents_array(texts)
 
         # 9. Save manually-embedded docs into Pinecone
         logger.debug("Saving pre-embedded documents to Pinecone")
-        vs_handler = PineconeVectorStoreHandler()
-        vs_handler.save_vectors(all_chunks, embeddings) 
-        logger.info(f"Saved {len(all_chunks)} chunks to Pinecone vector store successfully")
+        vs_handler = get_vector_store()
+        await asyncio.to_thread(vs_handler.save_soa, texts, metadatas, embeddings)
+        logger.info("Saved %s chunks to Pinecone vector store successfully", len(texts))
+
+        # 10. Record BM25 corpus statistics for keyword scoring in chat
+        keyword_index.add_texts(texts, metadatas)
+        await asyncio.to_thread(keyword_index.save, Config.KEYWORD_INDEX_PATH)
+
+        # Cached answers may be stale now that the corpus changed
+        semantic_cache.clear()
 
         return {
             "message": "Files uploaded and processed successfully",
             "uploaded_files": uploaded_files,
-            "total_chunks": len(all_chunks),
+            "total_chunks": len(texts),
             "vectorstore": "pinecone"
         }
 
+    except HTTPException:
+        # Validation failures keep their status instead of becoming a 500
+        raise
     except Exception as e:
-        logger.error(f"Error during upload process: {str(e)}")
+        logger.error("Error during upload process: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     
 
@@ -124,16 +180,19 @@ async def upload_pdfs(files: List[UploadFile] = File(...)):
 def list_uploaded_files():
     """
     List all uploaded files stored in S3.
-    Returns the S3 keys of uploaded PDFs.
+    Returns the S3 keys of uploaded PDFs, and per-file versions (ETag, size,
+    last-modified time) that change whenever a file is uploaded again.
     """
     try:
         storage = get_storage()  
-        keys = storage.list_files()  
+        versions = storage.list_file_versions()
+        keys = [version["key"] for version in versions]
 
-        logger.info(f"Fetched {len(keys)} files from S3")
+        logger.info("Fetched %s files from S3", len(keys))
         return {
             "total_files": len(keys),
-            "files": keys
+            "files": keys,
+            "versions": versions
         }
 
     except Exception as e:
@@ -147,25 +206,28 @@ async def delete_file(request: DeleteRequest):
     Delete a PDF file from S3 bucket using its S3 key.
     Also removes associated vectors from Pinecone.
     """
-    logger.info(f"Starting delete process for S3 key: {request.s3_key}")
+    logger.info("Starting delete process for S3 key: %s", request.s3_key)
     
     try:
         storage = get_storage()
         
         # 1. Delete file from S3
-        logger.debug(f"Deleting file from S3: {request.s3_key}")
+        logger.debug("Deleting file from S3: %s", request.s3_key)
         storage.delete(request.s3_key)
-        logger.info(f"File deleted from S3: {request.s3_key}")
+        logger.info("File deleted from S3: %s", request.s3_key)
         
         # 2. Remove associated vectors from Pinecone
         logger.debug("Removing associated vectors from Pinecone")
         try:
-            vs_handler = PineconeVectorStoreHandler()
-            deleted_count = vs_handler.delete_vectors_by_metadata({"s3_key": request.s3_key})
-            logger.info(f"Successfully deleted {deleted_count} vectors from Pinecone for s3_key: {request.s3_key}")
+            vs_handler = get_vector_store()
+            keyword_index.remove(request.s3_key)
+            await asyncio.to_thread(keyword_index.save, Config.KEYWORD_INDEX_PATH)
+            semantic_cache.clear()
+            deleted_count = await asyncio.to_thread(vs_handler.delete_vectors_by_s3_key, request.s3_key)
+            logger.info("Successfully deleted %s vectors from Pinecone for s3_key: %s", deleted_count, request.s3_key)
             
         except Exception as pinecone_error:
-            logger.warning(f"Failed to delete vectors from Pinecone: {str(pinecone_error)}")
+            logger.warning("Failed to delete vectors from Pinecone: %s", pinecone_error)
             # Continue with S3 deletion even if Pinecone deletion fails
         
         # Extract filename from S3 key for response
@@ -179,10 +241,55 @@ async def delete_file(request: DeleteRequest):
         )
         
     except Exception as e:
-        logger.error(f"Error during delete process: {str(e)}")
+        logger.error("Error during delete process: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
 
+@router.delete("/delete/batch", response_model=BatchDeleteResponse)
+async def delete_files(request: BatchDeleteRequest):
+    """
+    Delete several PDF files and their Pinecone vectors in one request.
+    S3 objects and per-file vectors are deleted concurrently, and the keyword
+    index is saved and the semantic cache cleared once for the whole batch.
+    """
+    s3_keys = list(dict.fromkeys(request.s3_keys))
+    logger.info("Starting batch delete process for %s S3 keys", len(s3_keys))
+
+    try:
+        storage = get_storage()
+
+        # 1. Delete files from S3
+        await asyncio.gather(*(asyncio.to_thread(storage.delete, s3_key) for s3_key in s3_keys))
+        logger.info("Deleted %s files from S3", len(s3_keys))
+
+        # 2. Remove associated vectors from Pinecone
+        try:
+            vs_handler = get_vector_store()
+            for s3_key in s3_keys:
+                keyword_index.remove(s3_key)
+            await asyncio.to_thread(keyword_index.save, Config.KEYWORD_INDEX_PATH)
+            semantic_cache.clear()
+            deleted_counts = await asyncio.gather(
+                *(asyncio.to_thread(vs_handler.delete_vectors_by_s3_key, s3_key) for s3_key in s3_keys)
+            )
+            logger.info("Successfully deleted %s vectors from Pinecone for %s files", sum(deleted_counts), len(s3_keys))
+
+        except Exception as pinecone_error:
+            logger.warning("Failed to delete vectors from Pinecone: %s", pinecone_error)
+            # Continue with S3 deletion even if Pinecone deletion fails
+
+        return BatchDeleteResponse(
+            message=f"{len(s3_keys)} files deleted successfully from S3",
+            deleted_files=[s3_key.split('/')[-1] for s3_key in s3_keys],
+            s3_keys=s3_keys,
+            success=True
+        )
+
+    except Exception as e:
+        logger.error("Error during batch delete process: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to delete files: {str(e)}")
+
+
 
 
 @router.post("/reset", response_model=ResetResponse)
@@ -208,27 +315,33 @@ async def reset_index(request: ResetRequest):
         pinecone_vectors_deleted = 0
         errors = []
         
-        # 1. Delete all files from S3
-        logger.info("Step 1: Deleting all files from S3")
-        try:
-            storage = get_storage()
-            s3_files_deleted = storage.delete_all_files()
-            logger.info(f"Successfully deleted {s3_files_deleted} files from S3")
-        except Exception as s3_error:
-            error_msg = f"S3 deletion failed: {str(s3_error)}"
+        # 1-2. Delete all files from S3 and all vectors from Pinecone concurrently;
+        # the backends are independent, so neither waits on the other
+        logger.info("Deleting all files from S3 and all vectors from Pinecone")
+        s3_result, pinecone_result = await asyncio.gather(
+            asyncio.to_thread(lambda: get_storage().delete_all_files()),
+            asyncio.to_thread(lambda: get_vector_store().delete_all_vectors()),
+            return_exceptions=True
+        )
+        
+        if isinstance(s3_result, Exception):
+            error_msg = f"S3 deletion failed: {str(s3_result)}"
             logger.error(error_msg)
             errors.append(error_msg)
+        else:
+            s3_files_deleted = s3_result
+            logger.info("Successfully deleted %s files from S3", s3_files_deleted)
         
-        # 2. Delete all vectors from Pinecone
-        logger.info("Step 2: Deleting all vectors from Pinecone")
-        try:
-            vs_handler = PineconeVectorStoreHandler()
-            pinecone_vectors_deleted = vs_handler.delete_all_vectors()
-            logger.info(f"Successfully deleted {pinecone_vectors_deleted} vectors from Pinecone")
-        except Exception as pinecone_error:
-            error_msg = f"Pinecone deletion failed: {str(pinecone_error)}"
+        if isinstance(pinecone_result, Exception):
+            error_msg = f"Pinecone deletion failed: {str(pinecone_result)}"
             logger.error(error_msg)
             errors.append(error_msg)
+        else:
+            pinecone_vectors_deleted = pinecone_result
+            keyword_index.clear()
+            await asyncio.to_thread(keyword_index.save, Config.KEYWORD_INDEX_PATH)
+            semantic_cache.clear()
+            logger.info("Successfully deleted %s vectors from Pinecone", pinecone_vectors_deleted)
         
         # 3. Prepare response
         success = len(errors) == 0
@@ -237,7 +350,7 @@ async def reset_index(request: ResetRequest):
         if errors:
             message += f". Errors: {'; '.join(errors)}"
         
-        logger.info(f"Reset operation completed. S3: {s3_files_deleted} files, Pinecone: {pinecone_vectors_deleted} vectors")
+        logger.info("Reset operation completed. S3: %s files, Pinecone: %s vectors", s3_files_deleted, pinecone_vectors_deleted)
         
         return ResetResponse(
             message=message,
@@ -253,6 +366,6 @@ async def reset_index(request: ResetRequest):
         )
         
     except Exception as e:
-        logger.error(f"Critical error during reset operation: {str(e)}")
+        logger.error("Critical error during reset operation: %s", e)
         raise HTTPException(status_code=500, detail=f"Reset operation failed: {str(e)}")
 
@@ -1,5 +1,13 @@
+import os
+import asyncio
+import hashlib
+import sqlite3
+import threading
 import logging
-from typing import List
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List
+import numpy as np
 from langchain.embeddings.base import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from app.config import Config
@@ -9,6 +17,59 @@ load_dotenv()
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+class DiskEmbeddingCache:
+    """
+    SQLite store of float16 document embeddings keyed by model and content
+    hash, so re-uploaded or partly changed PDFs reuse embeddings across
+    restarts. Rows are dropped oldest first beyond max_entries.
+    """
+
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        # Used from worker threads (asyncio.to_thread), serialized by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Earlier versions kept int8-quantized vectors in "embeddings"; they
+            # are too lossy to upsert again, so that table is dropped, not read
+            self._conn.execute("DROP TABLE IF EXISTS embeddings")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS document_embeddings ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, key))"
+            )
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the stored float16 vectors among keys."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM document_embeddings WHERE model = ? AND key IN ({','.join('?' * len(batch))})",
+                    (self.model_name, *batch)
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float16)
+        return found
+
+    def put_many(self, entries: Dict[str, np.ndarray]) -> None:
+        """Store float16 vectors and trim the oldest beyond max_entries."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO document_embeddings (model, key, vector) VALUES (?, ?, ?)",
+                [(self.model_name, key, vector.tobytes()) for key, vector in entries.items()]
+            )
+            self._conn.execute(
+                "DELETE FROM document_embeddings WHERE rowid <= (SELECT MAX(rowid) FROM document_embeddings) - ?",
+                (self.max_entries,)
+            )
+
+
 class EmbeddingModel:
     def __init__(self, model_name: str = None, api_key: str = None):
         """
@@ -20,49 +81,202 @@ class EmbeddingModel:
             api_key (str): API key for the provider
         """
         try:
-            logger.info(f"Initializing embedding model with model_name: {model_name or 'models/embedding-001'}")
+            logger.info("Initializing embedding model with model_name: %s", model_name or 'models/embedding-001')
             
             # Check if API key is provided
             if not api_key:
                 logger.error("Google API key for embeddings not found. Please set it in your environment or .env file.")
                 raise ValueError("Google API key for embeddings not found. Please set it in your environment or .env file.")
             
-            # Google Generative AI embeddings
+            # Google Generative AI embeddings; documents and queries use their own
+            # task types so query vectors land closer to the passages they match
+            model_name = model_name or "models/embedding-001"
             self.model: Embeddings = GoogleGenerativeAIEmbeddings(
-                model=model_name or "models/embedding-001",
+                model=model_name,
                 google_api_key=api_key,
                 task_type="retrieval_document" 
             )
+            # A shallow copy shares the document model's client, so both task
+            # types multiplex over one HTTP/2 gRPC channel instead of two
+            self.query_model: Embeddings = self.model.model_copy(update={"task_type": "retrieval_query"})
+            # Document embeddings keyed by content hash, least recently used first,
+            # stored as float16 (half the float32 size). Cache hits are upserted
+            # again on re-upload, and float16 keeps their cosine similarities
+            # within about 1e-5 of the original vectors, unlike int8
+            self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+            # Persistent second tier behind the in-memory document cache
+            self._disk_cache = DiskEmbeddingCache(
+                Config.EMBEDDING_DISK_CACHE_PATH,
+                model_name,
+                Config.EMBEDDING_DISK_CACHE_MAX_ENTRIES
+            )
+            # Query embeddings keyed by the exact query text, least recently used first
+            self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
             logger.debug("Successfully initialized embedding model")
             
         except Exception as e:
-            logger.error(f"Failed to initialize embedding model: {str(e)}")
+            logger.error("Failed to initialize embedding model: %s", e)
             raise
 
     def embed_query(self, text: str) -> List[float]:
         """Embed a single query string."""
         try:
-            logger.debug(f"Embedding query text of length: {len(text)}")
-            embedding = self.model.embed_query(text)
-            logger.debug(f"Successfully generated query embedding of dimension: {len(embedding)}")
-            logger.info(f"Query embedding size: {len(embedding)}")
-            return embedding
+            cached = self._query_cache_get(text)
+            if cached is not None:
+                return cached
+            logger.debug("Embedding query text of length: %s", len(text))
+            embedding = self.query_model.embed_query(text)
+            logger.debug("Successfully generated query embedding of dimension: %s", len(embedding))
+            return self._query_cache_put(text, embedding)
         except Exception as e:
-            logger.error(f"Failed to embed query: {str(e)}")
+            logger.error("Failed to embed query: %s", e)
             raise
 
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query string without blocking the event loop."""
+        try:
+            cached = self._query_cache_get(text)
+            if cached is not None:
+                return cached
+            logger.debug("Embedding query text of length: %s", len(text))
+            embedding = await self.query_model.aembed_query(text)
+            logger.debug("Successfully generated query embedding of dimension: %s", len(embedding))
+            return self._query_cache_put(text, embedding)
+        except Exception as e:
+            logger.error("Failed to embed query: %s", e)
+            raise
+
+    def _query_cache_get(self, text: str):
+        """Return a copy of a cached query embedding (marking it recently used), or None."""
+        embedding = self._query_cache.get(text)
+        if embedding is None:
+            return None
+        self._query_cache.move_to_end(text)
+        return list(embedding)
+
+    def _query_cache_put(self, text: str, embedding: List[float]) -> List[float]:
+        """Cache a query embedding, evicting the least recently used entries."""
+        self._query_cache[text] = list(embedding)
+        self._query_cache.move_to_end(text)
+        while len(self._query_cache) > Config.QUERY_EMBEDDING_CACHE_MAX_ENTRIES:
+            self._query_cache.popitem(last=False)
+        return embedding
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed multiple documents."""
         try:
-            logger.debug(f"Embedding {len(texts)} documents")
+            logger.debug("Embedding %s documents", len(texts))
             embeddings = self.model.embed_documents(texts)
             if embeddings and len(embeddings) > 0:
                 embedding_size = len(embeddings[0])
             else:
                 embedding_size = 0
-            logger.debug(f"Successfully generated embeddings. Shape: {len(embeddings)}x{embedding_size}")
-            logger.info(f"Document embedding size: {embedding_size}")
+            logger.debug("Successfully generated embeddings. Shape: %sx%s", len(embeddings), embedding_size)
+            return embeddings
+        except Exception as e:
+            logger.error("Failed to embed documents: %s", e)
+            raise
+
+
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cache_get(self, key: str):
+        vector = self._cache.get(key)
+        if vector is None:
+            return None
+        self._cache.move_to_end(key)
+        return vector.astype(np.float32)
+
+    def _cache_store(self, key: str, vector: np.ndarray) -> None:
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > Config.EMBEDDING_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def aembed_documents(self, texts: List[str], batch_size: int = None, concurrency: int = None) -> List[List[float]]:
+        """
+        Embed multiple documents with several batch requests in flight at once.
+        Texts already embedded (by content hash) are served from the cache and
+        duplicates within the call are only sent once.
+        
+        Args:
+            texts (List[str]): Texts to embed
+            batch_size (int): Texts per request (Google allows at most 100)
+            concurrency (int): Maximum number of concurrent batch requests
+        """
+        return (await self.aembed_documents_array(texts, batch_size, concurrency)).tolist()
+
+    async def aembed_documents_array(self, texts: List[str], batch_size: int = None, concurrency: int = None) -> np.ndarray:
+        """
+        Embed multiple documents like aembed_documents, returning a contiguous
+        float32 matrix of shape (len(texts), dimension) instead of nested lists.
+        """
+        keys = [self._content_hash(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        misses: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in misses:
+                continue
+            vector = self._cache_get(key)
+            if vector is not None:
+                vectors[key] = vector
+            else:
+                misses[key] = text
+
+        if misses:
+            stored = await asyncio.to_thread(self._disk_cache.get_many, list(misses))
+            for key, vector in stored.items():
+                self._cache_store(key, vector)
+                vectors[key] = vector.astype(np.float32)
+                del misses[key]
+
+        logger.debug("Embedding cache: %s hits, %s misses for %s documents", len(vectors), len(misses), len(texts))
+        if misses:
+            new_embeddings = await self._aembed_batches(list(misses.values()), batch_size, concurrency)
+            new_entries: Dict[str, np.ndarray] = {}
+            for key, embedding in zip(misses, new_embeddings):
+                # The exact float32 vector is used now; later hits get the float16 copy
+                vectors[key] = np.asarray(embedding, dtype=np.float32)
+                new_entries[key] = vectors[key].astype(np.float16)
+                self._cache_store(key, new_entries[key])
+            await asyncio.to_thread(self._disk_cache.put_many, new_entries)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    async def _aembed_batches(self, texts: List[str], batch_size: int = None, concurrency: int = None) -> List[List[float]]:
+        """
+        Embed texts in concurrent batch requests, preserving order. Texts are
+        batched longest first, so the slowest requests start first and the
+        short ones fill in at the end instead of leaving one straggler.
+        """
+        batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        semaphore = asyncio.Semaphore(concurrency or Config.EMBEDDING_CONCURRENCY)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await asyncio.to_thread(self.model.embed_documents, batch, batch_size=batch_size)
+
+        try:
+            logger.debug("Embedding %s documents in batches of %s", len(texts), batch_size)
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+            sorted_texts = [texts[i] for i in order]
+            batches = [sorted_texts[i:i + batch_size] for i in range(0, len(sorted_texts), batch_size)]
+            results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+            embeddings: List[List[float]] = [None] * len(texts)
+            for i, embedding in zip(order, (embedding for batch_embeddings in results for embedding in batch_embeddings)):
+                embeddings[i] = embedding
+            embedding_size = len(embeddings[0]) if embeddings else 0
+            logger.debug("Successfully generated embeddings. Shape: %sx%s", len(embeddings), embedding_size)
             return embeddings
         except Exception as e:
-            logger.error(f"Failed to embed documents: {str(e)}")
-            raise
\ No newline at end of file
+            logger.error("Failed to embed documents: %s", e)
+            raise
+
+@lru_cache(maxsize=1)
+def get_embedder() -> EmbeddingModel:
+    """Get the shared embedding model, created on first use."""
+    return EmbeddingModel(api_key=os.getenv("GOOGLE_API_KEY"))
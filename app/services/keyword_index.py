@@ -0,0 +1,170 @@
+import math
+import os
+import pickle
+import re
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+from langchain.schema import Document
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+@lru_cache(maxsize=4096)
+def _term_counts(text: str) -> Tuple[Counter, int]:
+    """
+    Token counts and length of a chunk, cached because the same popular
+    chunks come back from Pinecone query after query. Callers must not
+    mutate the returned Counter.
+    """
+    tokens = tokenize(text)
+    return Counter(tokens), len(tokens)
+
+
+class KeywordIndex:
+    """
+    In-memory BM25 corpus statistics for uploaded chunks.
+
+    Only document frequencies and lengths are kept, grouped per S3 key so a
+    deleted file can be subtracted again. Chunk text itself lives in Pinecone
+    metadata and is scored against these statistics at query time.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._files: Dict[str, Tuple[Counter, int, int]] = {}
+        self._doc_freq: Counter = Counter()
+        self._num_docs = 0
+        self._total_length = 0
+
+    def add_documents(self, documents: Iterable[Document]) -> None:
+        """Add chunk statistics, grouped by each chunk's s3_key metadata."""
+        documents = list(documents)
+        self.add_texts([doc.page_content for doc in documents], [doc.metadata for doc in documents])
+
+    def add_texts(self, texts: List[str], metadatas: List[dict]) -> None:
+        """Add chunk statistics from parallel text and metadata lists."""
+        grouped: Dict[str, List[str]] = {}
+        for text, metadata in zip(texts, metadatas):
+            grouped.setdefault(metadata.get("s3_key", ""), []).append(text)
+
+        for s3_key, texts in grouped.items():
+            self.remove(s3_key)
+            doc_freq: Counter = Counter()
+            total_length = 0
+            for text in texts:
+                tokens = tokenize(text)
+                doc_freq.update(set(tokens))
+                total_length += len(tokens)
+
+            self._files[s3_key] = (doc_freq, len(texts), total_length)
+            self._doc_freq.update(doc_freq)
+            self._num_docs += len(texts)
+            self._total_length += total_length
+
+        logger.debug("Keyword index now holds %s chunks from %s files", self._num_docs, len(self._files))
+
+    def remove(self, s3_key: str) -> None:
+        """Remove the statistics contributed by a file, if present."""
+        entry = self._files.pop(s3_key, None)
+        if entry is None:
+            return
+        doc_freq, num_docs, total_length = entry
+        self._doc_freq.subtract(doc_freq)
+        self._doc_freq = +self._doc_freq  # drop zero counts
+        self._num_docs -= num_docs
+        self._total_length -= total_length
+
+    def clear(self) -> None:
+        """Drop all corpus statistics."""
+        self._files.clear()
+        self._doc_freq.clear()
+        self._num_docs = 0
+        self._total_length = 0
+
+    def save(self, path: str) -> None:
+        """
+        Persist the per-file statistics so keyword scoring survives restarts.
+
+        Per-file counters are never mutated once added, so a shallow copy of
+        the file map is a consistent snapshot even while uploads continue.
+        """
+        files = dict(self._files)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(files, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        logger.debug("Saved keyword index for %s files to %s", len(files), path)
+
+    def load(self, path: str) -> bool:
+        """Load statistics saved by save(); returns False if none exist."""
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            files: Dict[str, Tuple[Counter, int, int]] = pickle.load(f)
+
+        self.clear()
+        for s3_key, (doc_freq, num_docs, total_length) in files.items():
+            self._files[s3_key] = (doc_freq, num_docs, total_length)
+            self._doc_freq.update(doc_freq)
+            self._num_docs += num_docs
+            self._total_length += total_length
+        logger.info("Loaded keyword index with %s chunks from %s files", self._num_docs, len(self._files))
+        return True
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Compute BM25 scores of each text for the query.
+
+        Uses the uploaded-corpus statistics when available and falls back to
+        the given texts as the corpus otherwise (e.g. after a restart).
+        """
+        query_terms = set(tokenize(query))
+
+        # Each text is tokenized once and reused across queries; only query terms are read
+        term_counts = []
+        lengths = []
+        for text in texts:
+            counts, length = _term_counts(text)
+            term_counts.append(counts)
+            lengths.append(length)
+
+        if self._num_docs:
+            num_docs = self._num_docs
+            avg_length = self._total_length / num_docs
+            doc_freq = self._doc_freq
+        else:
+            num_docs = len(texts)
+            avg_length = (sum(lengths) / num_docs) if num_docs else 0
+            doc_freq = Counter(term for counts in term_counts for term in query_terms if term in counts)
+
+        idf = {
+            term: math.log((num_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5) + 1)
+            for term in query_terms
+        }
+
+        scores = []
+        for counts, length in zip(term_counts, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+            score = 0.0
+            for term in query_terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    score += idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+# Shared index for the upload and chat routes
+keyword_index = KeywordIndex()
@@ -1,9 +1,29 @@
+import threading
+from typing import Any, Optional
+from cachetools import TTLCache
+from app.config import Config
+
+
 class Memory:
-    def __init__(self):
-        self.storage = {}
+    """
+    Bounded key-value store with least-recently-used eviction and expiry.
+
+    Entries expire `ttl` seconds after they were last stored, and the least
+    recently used entry is evicted once `maxsize` is exceeded. Access is
+    guarded by a lock so the store can be shared between threads.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.storage = TTLCache(
+            maxsize=maxsize or Config.MAX_CHAT_SESSIONS,
+            ttl=ttl or Config.CHAT_SESSION_TTL
+        )
+        self._lock = threading.RLock()
 
-    def store(self, key: str, value: str):
-        self.storage[key] = value
+    def store(self, key: str, value: Any):
+        with self._lock:
+            self.storage[key] = value
 
-    def retrieve(self, key: str) -> str:
-        return self.storage.get(key, "")
+    def retrieve(self, key: str, default: Any = "") -> Any:
+        with self._lock:
+            return self.storage.get(key, default)
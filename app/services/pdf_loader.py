@@ -1,87 +1,151 @@
 import os
+import re
+import hashlib
+import heapq
+import pickle
 import logging
-from langchain_community.document_loaders import PyPDFLoader
-from typing import List
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from app.config import Config
+
+try:
+    # PyMuPDF extracts text roughly an order of magnitude faster than pypdf
+    import pymupdf
+except ImportError:  # fall back to LangChain's pypdf-based loader
+    pymupdf = None
+
+try:
+    import tiktoken
+except ImportError:  # chunk lengths fall back to a characters-per-token estimate
+    tiktoken = None
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+if pymupdf is None:
+    logger.warning("PyMuPDF is not installed; PDFs will be parsed with the much slower pypdf loader")
+
+# Hex UUID prefix (uuid4().hex + "_") added to stored upload names
+UUID_PREFIX_PATTERN = re.compile(r"^[0-9a-fA-F]{32}_")
+
+
+def _original_filename(file_path: str) -> str:
+    """Base name of the file with any 32-character UUID prefix removed."""
+    # Remove UUID prefix if present
+    return UUID_PREFIX_PATTERN.sub("", os.path.basename(file_path), count=1)
+
+
 class PDFLoader:
     """
     Class to handle PDF loading and document splitting.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, data: Optional[bytes] = None, pages: Optional[Tuple[int, int]] = None):
         """
-        Initialize with the path to the PDF file.
+        Initialize with the path to the PDF file, optionally its contents when
+        the caller has already read them, and optionally a [start, stop) page
+        range to load instead of the whole document.
         """
-        logger.info(f"Initializing PDFLoader with file path: {file_path}")
+        logger.info("Initializing PDFLoader with file path: %s", file_path)
         
         if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
+            logger.error("File not found: %s", file_path)
             raise FileNotFoundError(f"File not found: {file_path}")
             
         if not file_path.lower().endswith('.pdf'):
-            logger.warning(f"File {file_path} does not have .pdf extension")
+            logger.warning("File %s does not have .pdf extension", file_path)
             
         self.file_path = file_path
+        self.data = data
+        self.pages = pages
         self.documents: List[Document] = []
-        logger.debug(f"PDFLoader initialized successfully for: {file_path}")
+        logger.debug("PDFLoader initialized successfully for: %s", file_path)
 
     def load(self) -> List[Document]:
         """
-        Load PDF file using LangChain's PyPDFLoader.
+        Load every page of the PDF into self.documents.
         Returns a list of Document objects with page text + metadata.
         """
         try:
-            logger.info(f"Loading PDF file: {self.file_path}")
-            loader = PyPDFLoader(self.file_path)
-            documents = loader.load()
-            
-            # Enhance metadata with original filename and better source tracking
-            enhanced_documents = []
-            for doc in documents:
-                # Extract original filename (not UUID)
-                original_filename = os.path.basename(self.file_path)
-                logger.debug(f"Original file path: {self.file_path}")
-                logger.debug(f"Extracted filename: {original_filename}")
-                
-                if '_' in original_filename and len(original_filename.split('_')[0]) == 32:
-                    # Remove UUID prefix if present
-                    original_filename = '_'.join(original_filename.split('_')[1:])
-                    logger.debug(f"Removed UUID prefix, new filename: {original_filename}")
-                
-                # Enhance metadata
-                enhanced_metadata = doc.metadata.copy()
-                enhanced_metadata.update({
-                    'original_filename': original_filename,
-                    'file_path': self.file_path,
-                    'file_size': os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0,
-                    'loader_type': 'PyPDFLoader',
-                    'source': original_filename, 
-                    'pdf_name': original_filename  
-                })
-                
-                logger.debug(f"Enhanced metadata for document: {enhanced_metadata}")
-                
-                # Create enhanced document
-                enhanced_doc = Document(
-                    page_content=doc.page_content,
-                    metadata=enhanced_metadata
-                )
-                enhanced_documents.append(enhanced_doc)
-            
-            self.documents = enhanced_documents
-            logger.info(f"Successfully loaded {len(self.documents)} pages from PDF")
-            logger.info(f"Original filename: {original_filename}")
+            logger.info("Loading PDF file: %s", self.file_path)
+            self.documents = list(self.iter_pages())
+            logger.info("Successfully loaded %s pages from PDF", len(self.documents))
             return self.documents
-            
+
         except Exception as e:
-            logger.error(f"Failed to load PDF file {self.file_path}: {str(e)}")
+            logger.error("Failed to load PDF file %s: %s", self.file_path, e)
             raise
 
+    def iter_pages(self) -> Iterator[Document]:
+        """
+        Yield one Document per page with text, skipping blank or near-empty
+        pages (e.g. scans without a text layer) and adding file metadata.
+        """
+        # Extract original filename (not UUID)
+        original_filename = _original_filename(self.file_path)
+        logger.debug("Extracted filename: %s", original_filename)
+
+        base_metadata = None
+        for doc in self._iter_raw_pages():
+            if not _has_text(doc.page_content):
+                continue
+            # File-level metadata is the same for every page, so build it once
+            # (after the first page, when any in-memory read has happened)
+            if base_metadata is None:
+                base_metadata = {
+                    'original_filename': original_filename,
+                    'file_path': self.file_path,
+                    'file_size': len(self.data) if self.data is not None else os.path.getsize(self.file_path),
+                    'loader_type': self.loader_type,
+                    'source': original_filename,
+                    'pdf_name': original_filename
+                }
+            # Enhance metadata in place; the loader's page Documents are not shared
+            doc.metadata.update(base_metadata)
+            yield doc
+
+    @property
+    def loader_type(self) -> str:
+        return 'PyMuPDF' if pymupdf is not None else 'PyPDFLoader'
+
+    def _iter_raw_pages(self) -> Iterator[Document]:
+        """
+        Extract one Document per page, with PyMuPDF when installed and
+        PyPDFLoader otherwise. Metadata mirrors PyPDFLoader's page fields.
+        PyMuPDF pages are extracted one at a time as they are consumed.
+        """
+        if pymupdf is None:
+            # Imported here: pulling in langchain_community costs every parser
+            # process a noticeable start-up delay when PyMuPDF is available
+            from langchain_community.document_loaders import PyPDFLoader
+            documents = PyPDFLoader(self.file_path).load()
+            yield from (documents[slice(*self.pages)] if self.pages else documents)
+            return
+
+        # Parse a whole document from one in-memory read instead of many small
+        # file reads, unless it is too large to hold in memory. A page range is
+        # opened by path so only the objects its pages use are read
+        if self.data is None and self.pages is None:
+            self.data = _read_if_small(self.file_path)
+        source = {"stream": self.data, "filetype": "pdf"} if self.data is not None else {"filename": self.file_path}
+
+        with pymupdf.open(**source) as pdf:
+            total_pages = pdf.page_count
+            start, stop = self.pages or (0, total_pages)
+            for page_number, page in enumerate(pdf.pages(start, min(stop, total_pages)), start):
+                yield Document(
+                    # Unclipped, so text running past the page edge is kept as pypdf does
+                    page_content=page.get_text("text", clip=pymupdf.INFINITE_RECT()),
+                    metadata={
+                        'source': self.file_path,
+                        'total_pages': total_pages,
+                        'page': page_number,
+                        'page_label': page.get_label() or str(page_number + 1)
+                    }
+                )
+
     def split(
         self,
         chunk_size: int = None,
@@ -91,8 +155,8 @@ class PDFLoader:
         Split loaded documents into smaller chunks for embeddings.
 
         Args:
-            chunk_size (int): Max characters per chunk.
-            chunk_overlap (int): Overlap between chunks.
+            chunk_size (int): Max tokens per chunk.
+            chunk_overlap (int): Overlap between chunks, in tokens.
 
         Returns:
             List[Document]: List of chunked Document objects.
@@ -102,26 +166,242 @@ class PDFLoader:
             raise ValueError("No documents loaded. Call load() first.")
 
         try:
-            logger.info(f"Splitting {len(self.documents)} documents into chunks")
-            logger.debug(f"Chunk size: {chunk_size}, Chunk overlap: {chunk_overlap}")
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                separators=["\n\n", "\n", ".", " ", ""]
-            )
-
-            split_docs = text_splitter.split_documents(self.documents)
-            
-            # Preserve enhanced metadata in split documents
-            for doc in split_docs:
-                # Ensure the source field points to the original file path for vector store
-                if 'file_path' in doc.metadata:
-                    doc.metadata['source'] = doc.metadata['file_path']
-            
-            logger.info(f"Successfully split documents into {len(split_docs)} chunks")
+            logger.info("Splitting %s documents into chunks", len(self.documents))
+            split_docs = list(_split_pages(self.documents, chunk_size, chunk_overlap))
+            logger.info("Successfully split documents into %s chunks", len(split_docs))
             return split_docs
-            
+
         except Exception as e:
-            logger.error(f"Failed to split documents: {str(e)}")
+            logger.error("Failed to split documents: %s", e)
             raise
+
+    def iter_chunks(self, chunk_size: int, chunk_overlap: int) -> Iterator[Document]:
+        """
+        Load and split the PDF page by page, yielding chunks as they are made
+        so only one page's text is held alongside the chunks.
+        """
+        return _split_pages(self.iter_pages(), chunk_size, chunk_overlap)
+
+
+def _split_pages(pages: Iterable[Document], chunk_size: int, chunk_overlap: int) -> Iterator[Document]:
+    """
+    Split page Documents into chunks one page at a time. Chunks never span
+    pages, so this matches splitting all pages at once.
+    """
+    logger.debug("Chunk size: %s, Chunk overlap: %s", chunk_size, chunk_overlap)
+    count_tokens = _token_counter()
+    text_splitter = _make_splitter(chunk_size, chunk_overlap)
+
+    for page in pages:
+        for doc in _merge_small_chunks(text_splitter.split_documents([page]), count_tokens, Config.MIN_CHUNK_TOKENS):
+            if not _has_text(doc.page_content):
+                continue
+            # Ensure the source field points to the original file path for vector store
+            if 'file_path' in doc.metadata:
+                doc.metadata['source'] = doc.metadata['file_path']
+            yield doc
+
+
+@lru_cache(maxsize=16)
+def _make_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Token-based splitter for the given settings, built once per worker process."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=_token_counter(),
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def _has_text(text: str) -> bool:
+    """True if the text has at least MIN_TEXT_CHARS characters once whitespace is stripped."""
+    return len(text.strip()) >= Config.MIN_TEXT_CHARS
+
+
+@lru_cache(maxsize=1)
+def load_token_encoding():
+    """
+    The tiktoken encoding in Config.CHUNK_TOKEN_ENCODING, loaded once per
+    process, or None if tiktoken or its encoding file is unavailable.
+
+    tiktoken downloads the encoding file on first use and keeps it in its disk
+    cache, so calling this at startup means no upload waits on the download
+    and pool workers load the file locally.
+    """
+    if tiktoken is None:
+        logger.error("tiktoken is not installed; chunk token counts will be approximated")
+        return None
+    try:
+        return tiktoken.get_encoding(Config.CHUNK_TOKEN_ENCODING)
+    except Exception as e:
+        logger.error("tiktoken encoding %s unavailable (%s); chunk token counts will be approximated",
+                     Config.CHUNK_TOKEN_ENCODING, e)
+        return None
+
+
+def _token_counter_name() -> str:
+    """How chunk tokens are counted in this process; part of the chunk cache key."""
+    return Config.CHUNK_TOKEN_ENCODING if load_token_encoding() is not None else "chars4"
+
+
+@lru_cache(maxsize=1)
+def _token_counter() -> Callable[[str], int]:
+    """
+    Token-length function for the splitter, built once per process.
+
+    Uses the tiktoken encoding from load_token_encoding; without it,
+    approximates four characters per token.
+    """
+    encoding = load_token_encoding()
+    if encoding is None:
+        return lambda text: (len(text) + 3) // 4
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _merge_small_chunks(chunks: List[Document], count_tokens: Callable[[str], int], min_tokens: int) -> List[Document]:
+    """Fold chunks shorter than min_tokens into the preceding chunk of the same page."""
+    merged: List[Document] = []
+    for chunk in chunks:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and previous.metadata.get('page') == chunk.metadata.get('page')
+            and previous.metadata.get('source') == chunk.metadata.get('source')
+            and count_tokens(chunk.page_content) < min_tokens
+        ):
+            previous.page_content = f"{previous.page_content} {chunk.page_content}"
+        else:
+            merged.append(chunk)
+    return merged
+
+
+def _read_if_small(file_path: str) -> Optional[bytes]:
+    """Read the whole file if it fits within MAX_IN_MEMORY_PDF_BYTES, else return None."""
+    if os.path.getsize(file_path) > Config.MAX_IN_MEMORY_PDF_BYTES:
+        return None
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def _file_hash(file_path: str) -> str:
+    """SHA-256 of the file contents, read in blocks rather than loaded whole."""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _evict_chunk_cache(cache_dir: str, max_bytes: int) -> None:
+    """Remove least recently used cache files until the directory fits in max_bytes."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.pkl') and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+
+    # Usually only a few files go, so pop the oldest from a heap instead of sorting all
+    heapq.heapify(entries)
+    while entries and total > max_bytes:
+        _, size, path = heapq.heappop(entries)
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # already evicted by another worker
+            pass
+        total -= size
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Number of pages in the PDF, or 0 when PyMuPDF is not installed (the
+    pypdf fallback cannot load a page range without parsing every page).
+    """
+    if pymupdf is None:
+        return 0
+    with pymupdf.open(file_path) as pdf:
+        return pdf.page_count
+
+
+def page_ranges(total_pages: int, pages_per_task: int) -> List[Optional[Tuple[int, int]]]:
+    """
+    Split a document into [start, stop) page ranges of at most pages_per_task
+    pages for parallel parsing, or [None] (the whole document in one task)
+    when it fits in a single range. Ranges are sized evenly so no task is
+    left with a short tail (e.g. 60 pages become 30 + 30, not 50 + 10).
+    """
+    if total_pages <= pages_per_task:
+        return [None]
+    num_tasks = -(-total_pages // pages_per_task)
+    bounds = [total_pages * i // num_tasks for i in range(num_tasks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_and_chunk(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    pages: Optional[Tuple[int, int]] = None,
+    content_hash: Optional[str] = None
+) -> List[Tuple[str, dict]]:
+    """
+    Load and split a PDF, or one [start, stop) page range of it, returning
+    plain (text, metadata) pairs. Callers splitting one file into several
+    page ranges should hash it once and pass content_hash to each task.
+
+    Module-level so it can run in a process pool; plain tuples are cheaper
+    to send back to the parent process than Document objects. Chunks never
+    span pages, so the chunks of consecutive page ranges concatenate to the
+    chunks of the whole document.
+
+    Results are cached on disk keyed by the file's content hash and the
+    chunking parameters, so re-uploading the same PDF skips parsing. Cache
+    files are touched on every hit and evicted least recently used first.
+    """
+    cache_dir = Config.CHUNK_CACHE_DIR
+    if content_hash is None:
+        content_hash = _file_hash(file_path)
+    # The counter is part of the key so chunks approximated without tiktoken
+    # are never served once the real encoding is available (or vice versa)
+    settings = (_token_counter_name(), chunk_size, chunk_overlap, Config.MIN_CHUNK_TOKENS, Config.MIN_TEXT_CHARS)
+    if pages:
+        settings += (f"p{pages[0]}_{pages[1]}",)
+    cache_key = "-".join(str(part) for part in (content_hash, *settings))
+    cache_path = os.path.join(cache_dir, f"{cache_key}.pkl")
+
+    try:
+        with open(cache_path, 'rb') as f:
+            chunks = pickle.load(f)
+        os.utime(cache_path)
+        logger.info("Chunk cache hit for %s: %s chunks", file_path, len(chunks))
+        # Path-derived metadata belongs to this upload, not the cached one
+        original_filename = _original_filename(file_path)
+        for _, metadata in chunks:
+            metadata.update({
+                'original_filename': original_filename,
+                'pdf_name': original_filename,
+                'file_path': file_path,
+                'source': file_path
+            })
+        return chunks
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Ignoring unreadable chunk cache file %s: %s", cache_path, e)
+
+    pdf_loader = PDFLoader(file_path, pages=pages)
+    result = [(chunk.page_content, chunk.metadata) for chunk in pdf_loader.iter_chunks(chunk_size, chunk_overlap)]
+    logger.info("Created %s chunks from %s", len(result), file_path)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+        _evict_chunk_cache(cache_dir, Config.CHUNK_CACHE_MAX_BYTES)
+    except Exception as e:
+        logger.warning("Failed to write chunk cache file %s: %s", cache_path, e)
+
+    return result
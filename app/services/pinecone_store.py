@@ -1,12 +1,30 @@
 import os
+import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+import numpy as np
 from langchain.schema import Document
-from langchain_pinecone import PineconeVectorStore
 from langchain.embeddings.base import Embeddings
 from pinecone import Pinecone, ServerlessSpec
 from app.config import Config
 
+try:
+    # gRPC client sends vectors as packed float32 protobuf instead of JSON
+    from pinecone.grpc import GRPCIndex, PineconeGRPC
+except ImportError:  # grpc extra not installed
+    GRPCIndex = PineconeGRPC = None
+
+if TYPE_CHECKING:
+    # langchain_pinecone is only needed by the LangChain vectorstore helpers,
+    # so it is imported where they use it rather than at start-up
+    from langchain_core.vectorstores import VectorStoreRetriever
+    from langchain_pinecone import PineconeVectorStore
+
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
@@ -21,17 +39,23 @@ class PineconeVectorStoreHandler:
         """
         self.index_name = index_name or Config.PINECONE_INDEX_NAME
         self.namespace = namespace
-        self.vectorstore: Optional[PineconeVectorStore] = None
+        self.vectorstore: Optional["PineconeVectorStore"] = None
+        # Retrievers over the current vectorstore, keyed by k
+        self._retrievers: Dict[int, "VectorStoreRetriever"] = {}
         
         # Initialize Pinecone client
         api_key = os.getenv("PINECONE_API_KEY")
         if not api_key:
             raise RuntimeError("PINECONE_API_KEY environment variable not set")
         
-        logger.info(f"Initializing PineconeVectorStoreHandler with index: {self.index_name}, namespace: {self.namespace}")
+        logger.info("Initializing PineconeVectorStoreHandler with index: %s, namespace: %s", self.index_name, self.namespace)
         
         # Initialize Pinecone client
+        self.api_key = api_key
         self.pc = Pinecone(api_key=api_key)
+        # Index handles are created on first use and reused afterwards
+        self._index = None
+        self._query_index = None
         # Check if index exists, create if not
         self._ensure_index_exists()
 
@@ -42,7 +66,7 @@ class PineconeVectorStoreHandler:
             existing_indexes = [index.name for index in self.pc.list_indexes()]
             
             if self.index_name not in existing_indexes:
-                logger.info(f"Creating Pinecone index: {self.index_name}")
+                logger.info("Creating Pinecone index: %s", self.index_name)
                 
                 # Create index with serverless spec
                 self.pc.create_index(
@@ -54,91 +78,156 @@ class PineconeVectorStoreHandler:
                         region="us-east-1"
                     )
                 )
-                logger.info(f"Pinecone index '{self.index_name}' created successfully")
+                logger.info("Pinecone index '%s' created successfully", self.index_name)
             else:
-                logger.info(f"Pinecone index '{self.index_name}' already exists")
+                logger.info("Pinecone index '%s' already exists", self.index_name)
                 
         except Exception as e:
-            logger.error(f"Failed to ensure Pinecone index exists: {str(e)}")
+            logger.error("Failed to ensure Pinecone index exists: %s", e)
             raise
 
-    def save_documents(self, documents: List[Document], embedding_model: Embeddings) -> PineconeVectorStore:
+    def get_index(self):
+        """
+        Get a handle to the Pinecone index.
+        
+        Passes the configured host when targeting the default index so the
+        client skips the describe_index lookup needed to resolve it. The
+        handle is created once and reused, keeping its connection pool warm.
+        """
+        if self._index is None:
+            self._index = self.pc.Index(self.index_name, host=self._index_host())
+        return self._index
+
+    def get_query_index(self):
+        """
+        Get an index handle for the query and upsert hot paths.
+        
+        Uses the gRPC client when available so vectors travel as packed
+        float32 protobuf rather than JSON text; falls back to the REST handle.
+        """
+        if PineconeGRPC is None:
+            logger.debug("Pinecone gRPC client not installed, using REST index for queries")
+            return self.get_index()
+        if self._query_index is None:
+            self._query_index = PineconeGRPC(api_key=self.api_key).Index(self.index_name, host=self._index_host())
+        return self._query_index
+
+    def _index_host(self) -> str:
+        """Configured host for the default index, or empty to let the client resolve it."""
+        if self.index_name == Config.PINECONE_INDEX_NAME and Config.PINECONE_HOST:
+            return Config.PINECONE_HOST
+        return ""
+
+    def _ensure_vectorstore(self, embedding_model: Embeddings) -> "PineconeVectorStore":
+        """
+        Create the LangChain vectorstore over the shared index handle, reusing
+        the existing one (and its cached retrievers) for the same embedding model.
+        """
+        if self.vectorstore is None or self.vectorstore.embeddings is not embedding_model:
+            from langchain_pinecone import PineconeVectorStore
+            self._retrievers.clear()
+            self.vectorstore = PineconeVectorStore(
+                index=self.get_index(),
+                embedding=embedding_model,
+                namespace=self.namespace
+            )
+        return self.vectorstore
+
+    def save_documents(self, documents: Iterable[Document], embedding_model: Embeddings) -> "PineconeVectorStore":
         """
         Save documents into Pinecone vector store with embeddings.
+
+        Documents are consumed in groups that are embedded and upserted before
+        the next group is read, so a lazy iterable (e.g. PDFLoader.iter_chunks)
+        is never held in memory all at once.
         
         Args:
-            documents (List[Document]): Chunked documents with metadata
+            documents (Iterable[Document]): Chunked documents with metadata
             embedding_model (Embeddings): Embedding model instance
         """
         try:
-            logger.info(f"Saving {len(documents)} documents to Pinecone vector store")
-            logger.debug(f"Using embedding model: {type(embedding_model).__name__}")
-            
-            # Log metadata information for debugging
-            for i, doc in enumerate(documents[:3]):  # Log first 3 documents
-                logger.debug(f"Document {i} metadata: {doc.metadata}")
+            logger.info("Saving documents to Pinecone vector store")
+            logger.debug("Using embedding model: %s", type(embedding_model).__name__)
             
-            # Get the index
-            index = self.pc.Index(self.index_name)
+            # Writes go straight to the index through save_soa; the LangChain
+            # wrapper is only needed for retrievers and is reused when possible
+            self._ensure_vectorstore(embedding_model)
             
-            # Create Pinecone vector store
-            self.vectorstore = PineconeVectorStore(
-                index=index,
-                embedding=embedding_model,
-                namespace=self.namespace
-            )
-            
-            # Add documents to the vector store
-            self.vectorstore.add_documents(documents)
+            # Each group fills every concurrent embedding request once
+            batch_size = Config.EMBEDDING_BATCH_SIZE
+            group_size = batch_size * Config.EMBEDDING_CONCURRENCY
+            documents = iter(documents)
+            saved = 0
+            with ThreadPoolExecutor(max_workers=Config.EMBEDDING_CONCURRENCY) as executor:
+                while group := list(islice(documents, group_size)):
+                    # Log metadata information for debugging
+                    if not saved and logger.isEnabledFor(logging.DEBUG):
+                        for i, doc in enumerate(group[:3]):  # Log first 3 documents
+                            logger.debug("Document %s metadata: %s", i, doc.metadata)
+
+                    # Embed in batches of EMBEDDING_BATCH_SIZE with several requests in flight,
+                    # then upsert through the batched, concurrent save_soa path
+                    texts = [doc.page_content for doc in group]
+                    batch_embeddings = executor.map(
+                        embedding_model.embed_documents,
+                        [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+                    )
+                    embeddings = np.asarray(
+                        [embedding for batch in batch_embeddings for embedding in batch],
+                        dtype=np.float32
+                    )
+                    self.save_soa(
+                        texts,
+                        [doc.metadata for doc in group],
+                        embeddings,
+                        ids=[self.content_id(doc.metadata.get("source", ""), doc.page_content) for doc in group]
+                    )
+                    saved += len(group)
             
-            logger.info("Documents saved to Pinecone vector store successfully")
+            logger.info("Saved %s documents to Pinecone vector store successfully", saved)
             return self.vectorstore
             
         except Exception as e:
-            logger.error(f"Failed to save documents to Pinecone vector store: {str(e)}")
+            logger.error("Failed to save documents to Pinecone vector store: %s", e)
             raise
 
-    def load_vectorstore(self, embedding_model: Embeddings) -> PineconeVectorStore:
+    def load_vectorstore(self, embedding_model: Embeddings) -> "PineconeVectorStore":
         """
         Load existing Pinecone vector store.
         """
         try:
             logger.info("Loading existing Pinecone vector store")
-            logger.debug(f"Using embedding model: {type(embedding_model).__name__}")
+            logger.debug("Using embedding model: %s", type(embedding_model).__name__)
             
-            # Get the index
-            index = self.pc.Index(self.index_name)
-            
-            # Create Pinecone vector store
-            self.vectorstore = PineconeVectorStore(
-                index=index,
-                embedding=embedding_model,
-                namespace=self.namespace
-            )
+            self._ensure_vectorstore(embedding_model)
             
             logger.info("Pinecone vector store loaded successfully")
             return self.vectorstore
             
         except Exception as e:
-            logger.error(f"Failed to load Pinecone vector store: {str(e)}")
+            logger.error("Failed to load Pinecone vector store: %s", e)
             raise
 
     def get_retriever(self, k: int = 3):
         """
-        Get retriever interface for querying vectorstore.
+        Get retriever interface for querying vectorstore. Retrievers are
+        reused per k until the vectorstore is replaced.
         """
         if not self.vectorstore:
             logger.error("Vectorstore is not initialized. Load or save documents first.")
             raise RuntimeError("Vectorstore is not initialized. Load or save documents first.")
         
-        logger.debug(f"Creating retriever with k={k} documents")
-        return self.vectorstore.as_retriever(
-            search_kwargs={
-                "k": k,
-                "score_threshold": 0.0,
-                "include_metadata": True
-            }
-        )
+        retriever = self._retrievers.get(k)
+        if retriever is None:
+            logger.debug("Creating retriever with k=%s documents", k)
+            retriever = self._retrievers[k] = self.vectorstore.as_retriever(
+                search_kwargs={
+                    "k": k,
+                    "score_threshold": 0.0,
+                    "include_metadata": True
+                }
+            )
+        return retriever
     
     def test_similarity_search(self, query: str, k: int = 3):
         """
@@ -149,12 +238,12 @@ class PineconeVectorStoreHandler:
             raise RuntimeError("Vectorstore is not initialized.")
         
         try:
-            logger.debug(f"Testing similarity search with query: {query}")
+            logger.debug("Testing similarity search with query: %s", query)
             docs = self.vectorstore.similarity_search(query, k=k)
-            logger.info(f"Similarity search returned {len(docs)} documents")
+            logger.info("Similarity search returned %s documents", len(docs))
             return docs
         except Exception as e:
-            logger.error(f"Similarity search failed: {str(e)}")
+            logger.error("Similarity search failed: %s", e)
             raise
 
     def delete_all(self):
@@ -166,12 +255,12 @@ class PineconeVectorStoreHandler:
                 logger.error("Vectorstore is not initialized.")
                 raise RuntimeError("Vectorstore is not initialized.")
             
-            logger.info(f"Deleting all vectors from namespace: {self.namespace}")
+            logger.info("Deleting all vectors from namespace: %s", self.namespace)
             self.vectorstore.delete(delete_all=True)
             logger.info("All vectors deleted successfully")
             
         except Exception as e:
-            logger.error(f"Failed to delete vectors: {str(e)}")
+            logger.error("Failed to delete vectors: %s", e)
             raise
 
     def get_stats(self):
@@ -179,13 +268,13 @@ class PineconeVectorStoreHandler:
         Get statistics about the vector store.
         """
         try:
-            index = self.pc.Index(self.index_name)
+            index = self.get_index()
             stats = index.describe_index_stats()
-            logger.info(f"Pinecone index stats: {stats}")
+            logger.info("Pinecone index stats: %s", stats)
             return stats
             
         except Exception as e:
-            logger.error(f"Failed to get Pinecone stats: {str(e)}")
+            logger.error("Failed to get Pinecone stats: %s", e)
             raise
 
     
@@ -197,7 +286,7 @@ class PineconeVectorStoreHandler:
             int: Number of vectors deleted
         """
         try:
-            index = self.pc.Index(self.index_name)
+            index = self.get_index()
             
             logger.info("Starting bulk deletion of all vectors from Pinecone")
             
@@ -209,32 +298,138 @@ class PineconeVectorStoreHandler:
                 logger.info("No vectors found in Pinecone index")
                 return 0
             
-            logger.info(f"Found {total_vectors} vectors to delete from Pinecone")
+            logger.info("Found %s vectors to delete from Pinecone", total_vectors)
             
             # Delete all vectors in the namespace
             index.delete(delete_all=True, namespace=self.namespace)
             
-            logger.info(f"Successfully deleted all {total_vectors} vectors from Pinecone")
+            logger.info("Successfully deleted all %s vectors from Pinecone", total_vectors)
             return total_vectors
             
         except Exception as e:
-            logger.error(f"Failed to delete all vectors from Pinecone: {str(e)}")
+            logger.error("Failed to delete all vectors from Pinecone: %s", e)
+            raise
+
+    @staticmethod
+    def vector_id(s3_key: str, chunk_id: int) -> str:
+        """
+        Build a chunk's vector ID. IDs are prefixed by the file's S3 key so all
+        vectors of a file can be listed by prefix. Uploaded files are keyed by
+        their content hash, so re-ingesting a file overwrites its vectors, and
+        files that merely share a name never collide.
+        """
+        return f"{s3_key}#{chunk_id}"
+
+    @staticmethod
+    def content_id(source: str, text: str) -> str:
+        """
+        Build a vector ID from a chunk's source and content, so saving the same
+        documents again overwrites their vectors instead of duplicating them.
+        """
+        return hashlib.blake2b(f"{source}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def delete_vectors_by_s3_key(self, s3_key: str) -> int:
+        """
+        Delete all vectors of one uploaded file.
+        
+        Lists the file's vector IDs by prefix and deletes them by ID, which
+        serverless indexes support, instead of a metadata-filtered delete
+        that needs a scan.
+        
+        Files indexed before IDs carried the S3 key prefix have legacy
+        {file_name}_{chunk_id} IDs that a prefix listing cannot find; when no
+        prefixed IDs exist, their vectors are deleted by s3_key metadata
+        filter instead (the number deleted is then unknown and reported as 0).
+        
+        Returns:
+            int: Number of vectors deleted
+        """
+        try:
+            index = self.get_index()
+            ids = [
+                vector_id
+                for page in index.list(prefix=f"{s3_key}#", namespace=self.namespace)
+                for vector_id in page
+            ]
+            if not ids:
+                logger.info("No prefixed vector IDs for s3_key %s, deleting legacy vectors by metadata", s3_key)
+                index.delete(filter={"s3_key": {"$eq": s3_key}}, namespace=self.namespace)
+                return 0
+            # Delete by ID in batches of at most 1000
+            for start in range(0, len(ids), 1000):
+                index.delete(ids=ids[start:start + 1000], namespace=self.namespace)
+            logger.info("Deleted %s vectors for s3_key: %s", len(ids), s3_key)
+            return len(ids)
+            
+        except Exception as e:
+            logger.error("Failed to delete vectors for s3_key %s: %s", s3_key, e)
             raise
 
     def save_vectors(self, chunks, embeddings):
-        ids = [f"{chunk.metadata['file_name']}_{chunk.metadata['chunk_id']}" for chunk in chunks]
+        """
+        Upsert pre-embedded chunks; see save_soa.
+        """
+        self.save_soa(
+            [chunk.page_content for chunk in chunks],
+            [chunk.metadata for chunk in chunks],
+            np.asarray(embeddings, dtype=np.float32)
+        )
+
+    def save_soa(self, texts: List[str], metadatas: List[dict], embeddings: np.ndarray, ids: Optional[List[str]] = None):
+        """
+        Upsert pre-embedded chunks given as parallel texts, metadata and a
+        (N, dimension) float32 matrix, in fixed-size batches with several
+        requests in flight at once. Rows are converted to Python floats one
+        batch at a time rather than for the whole upload up front.
+        
+        IDs default to vector_id() of each chunk's s3_key and chunk_id.
+        
+        Vectors are kept at float32: Pinecone dense indexes store float32 and
+        the gRPC client packs values as 4-byte floats, so rounding to float16
+        first would lose precision without shrinking the payload.
+        """
+        if ids is None:
+            ids = [self.vector_id(metadata['s3_key'], metadata['chunk_id']) for metadata in metadatas]
         meta = []
 
-        for i, chunk in enumerate(chunks):
-            metadata = chunk.metadata.copy()
+        for text, metadata in zip(texts, metadatas):
+            metadata = metadata.copy()
             # Save both the text chunk and the real chunk data
-            metadata["text"] = chunk.page_content  # The text used for embedding/search
+            metadata["text"] = text  # The text used for embedding/search
             meta.append(metadata)
 
+        batch_size = Config.PINECONE_UPSERT_BATCH_SIZE
+        index = self.get_query_index()
+
+        def upsert_batch(start: int):
+            end = start + batch_size
+            batch = list(zip(ids[start:end], embeddings[start:end].tolist(), meta[start:end]))
+            started = time.perf_counter()
+            index.upsert(vectors=batch, namespace=self.namespace)
+            logger.debug("Upserted batch of %s vectors in %.3fs", len(batch), time.perf_counter() - started)
+
         # upsert into Pinecone
-        self.pc.Index(self.index_name).upsert(
-            vectors=[(ids[i], embeddings[i], meta[i]) for i in range(len(chunks))],
-            namespace="default"
-        )
-        print(f"✅ Saved {len(chunks)} vectors to Pinecone")
+        batch_starts = range(0, len(ids), batch_size)
+        with ThreadPoolExecutor(max_workers=Config.PINECONE_UPSERT_CONCURRENCY) as executor:
+            # Consume the results so a failed batch raises here
+            list(executor.map(upsert_batch, batch_starts))
+        logger.info("Saved %s vectors to Pinecone in %s batches", len(ids), len(batch_starts))
+
+
+async def aquery(index, **kwargs):
+    """
+    Query an index handle from async code.
+
+    gRPC handles issue the query with async_req=True and the returned future
+    is awaited directly, so no worker thread is held for the round trip; REST
+    handles fall back to running the blocking query in a thread.
+    """
+    if GRPCIndex is not None and isinstance(index, GRPCIndex):
+        return await asyncio.wrap_future(index.query(async_req=True, **kwargs))
+    return await asyncio.to_thread(index.query, **kwargs)
+
 
+@lru_cache(maxsize=1)
+def get_vector_store() -> PineconeVectorStoreHandler:
+    """Get the shared Pinecone handler, created on first use."""
+    return PineconeVectorStoreHandler()
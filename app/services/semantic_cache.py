@@ -0,0 +1,75 @@
+import time
+import logging
+from typing import Any, List, Optional
+import numpy as np
+from app.config import Config
+
+# Get logger for this module
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-memory cache of responses keyed by query embedding.
+
+    A lookup returns the stored response of the most similar earlier query
+    when its cosine similarity reaches the threshold and the entry has not
+    expired. Embeddings are kept L2-normalised in a preallocated float32
+    ring buffer, so a lookup is one matrix-vector product and an insert
+    overwrites the oldest slot instead of copying the matrix.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clear()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding: List[float]) -> Optional[Any]:
+        """Return the cached response for a similar query, or None."""
+        if not self._size:
+            return None
+
+        similarities = self._vectors[:self._size] @ self._normalize(embedding)
+        # Expired slots can never be a hit
+        similarities[self._expires_at[:self._size] <= time.monotonic()] = -np.inf
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            logger.debug("Semantic cache hit with similarity %.4f", similarities[best])
+            return self._values[best]
+        return None
+
+    def put(self, embedding: List[float], value: Any) -> None:
+        """Store a response, overwriting the oldest entry when full."""
+        vector = self._normalize(embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        slot = self._next_slot
+        self._vectors[slot] = vector
+        self._expires_at[slot] = time.monotonic() + self.ttl_seconds
+        self._values[slot] = value
+        self._next_slot = (slot + 1) % self.max_entries
+        self._size = max(self._size, slot + 1)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._vectors: Optional[np.ndarray] = None  # allocated on first put, once the dimension is known
+        self._expires_at = np.zeros(self.max_entries)
+        self._values: List[Any] = [None] * self.max_entries
+        self._next_slot = 0
+        self._size = 0
+
+
+# Shared cache for chat responses; cleared whenever the indexed corpus changes
+semantic_cache = SemanticCache(
+    threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=Config.SEMANTIC_CACHE_TTL,
+    max_entries=Config.SEMANTIC_CACHE_MAX_ENTRIES
+)
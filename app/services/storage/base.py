@@ -10,12 +10,15 @@ logger = logging.getLogger(__name__)
 
 # ---------- Interface ----------
 class BaseStorageService:
-    def save_upload(self, file: UploadFile) -> Dict:
+    def save_upload(self, file: UploadFile, content_hash: Optional[str] = None) -> Dict:
         raise NotImplementedError
 
     def list_files(self, prefix: str) -> List[str]:
         raise NotImplementedError
 
+    def list_file_versions(self, prefix: str) -> List[Dict]:
+        raise NotImplementedError
+
     def delete(self, key_or_path: str) -> None:
         raise NotImplementedError
 
@@ -1,4 +1,6 @@
 import boto3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from botocore.config import Config as BotoConfig
 from boto3.s3.transfer import TransferConfig
 from app.services.storage.base import BaseStorageService
@@ -20,18 +22,26 @@ class S3StorageService(BaseStorageService):
         self.region = region or os.getenv("AWS_DEFAULT_REGION", "us-east-1")
         self.base_prefix = base_prefix if base_prefix.endswith("/") else base_prefix + "/"
 
+        # One shared client for all threads: its connection pool must cover concurrent
+        # uploads, multipart parts and bulk-delete workers (the default is only 10)
+        self.client = boto3.client("s3", config=BotoConfig(
+            region_name=self.region,
+            max_pool_connections=64,
+            tcp_keepalive=True,
+            retries={"mode": "adaptive", "max_attempts": 5}
+        ))
         # multipart threshold ~8MB
-        self.client = boto3.client("s3", config=BotoConfig(region_name=self.region))
         self.transfer_cfg = TransferConfig(multipart_threshold=8 * 1024 * 1024,
                                            max_concurrency=8,
                                            multipart_chunksize=8 * 1024 * 1024)
 
-    def _key_for(self, filename: str) -> str:
+    def _key_for(self, filename: str, content_hash: Optional[str] = None) -> str:
+        # A content-hash key makes re-uploading the same file overwrite its object
         ext = os.path.splitext(filename)[1] or ".bin"
-        return f"{self.base_prefix}{uuid.uuid4().hex}{ext}"
+        return f"{self.base_prefix}{content_hash or uuid.uuid4().hex}{ext}"
 
-    def save_upload(self, file: UploadFile) -> Dict:
-        key = self._key_for(file.filename)
+    def save_upload(self, file: UploadFile, content_hash: Optional[str] = None) -> Dict:
+        key = self._key_for(file.filename, content_hash)
         content_type = file.content_type or mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
 
         file.file.seek(0)
@@ -47,7 +57,7 @@ class S3StorageService(BaseStorageService):
             Config=self.transfer_cfg
         )
 
-        logger.info(f"Uploaded to s3://{self.bucket}/{key}")
+        logger.info("Uploaded to s3://%s/%s", self.bucket, key)
         return {
             "storage": "s3",
             "bucket": self.bucket,
@@ -66,10 +76,30 @@ class S3StorageService(BaseStorageService):
                 keys.append(obj["Key"])
         return keys
 
+    def list_file_versions(self, prefix: str = "") -> List[Dict]:
+        """
+        List files with the object fields that change whenever a file is
+        written again (ETag, size and last-modified time), from the same
+        listing requests as list_files.
+        """
+        full_prefix = f"{self.base_prefix}{prefix}".lstrip("/")
+        versions: List[Dict] = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix):
+            for obj in page.get("Contents", []):
+                versions.append({
+                    "key": obj["Key"],
+                    "etag": obj["ETag"].strip('"'),
+                    "size": obj["Size"],
+                    "last_modified": obj["LastModified"].isoformat()
+                })
+        return versions
+
     def delete(self, key_or_path: str) -> None:
         self.client.delete_object(Bucket=self.bucket, Key=key_or_path)
 
     def url_for(self, key_or_path: str, expires_in: int = 3600) -> str:
+        # Signed locally with the client's credentials; no request is made to AWS
         return self.client.generate_presigned_url(
             "get_object",
             Params={"Bucket": self.bucket, "Key": key_or_path},
@@ -77,48 +107,57 @@ class S3StorageService(BaseStorageService):
         )
 
 
-    def delete_all_files(self, prefix: str = "") -> int:
+    def delete_all_files(self, prefix: str = "", max_concurrency: int = 16) -> int:
         """
         Delete all files from S3 bucket with optional prefix filter.
         
+        Each listed page (up to 1000 keys) is removed with one delete_objects
+        call; page deletes run concurrently while listing continues, and
+        listing pauses while too many pages are waiting to be deleted.
+        
         Args:
             prefix (str): Optional prefix to filter files for deletion
+            max_concurrency (int): Maximum number of delete_objects calls in flight
             
         Returns:
             int: Number of files deleted
         """
         try:
             full_prefix = f"{self.base_prefix}{prefix}".lstrip("/")
-            deleted_count = 0
             
-            logger.info(f"Starting bulk deletion of files with prefix: {full_prefix}")
+            logger.info("Starting bulk deletion of files with prefix: %s", full_prefix)
             
-            # List all objects with the prefix
+            def delete_page(objects_to_delete: List[Dict]) -> int:
+                # Delete objects in batches (max 1000 per request)
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": objects_to_delete}
+                )
+                
+                # Log any errors
+                if "Errors" in response:
+                    for error in response["Errors"]:
+                        logger.error("Failed to delete %s: %s", error['Key'], error['Message'])
+                return len(response.get("Deleted", []))
+            
+            # List all objects with the prefix, handing each page to the pool. At most
+            # two pages per worker are pending, so listing millions of keys ahead of
+            # the deletes cannot pile every key list up in memory
+            pending = deque()
+            deleted_count = 0
             paginator = self.client.get_paginator("list_objects_v2")
-            for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix):
-                if "Contents" in page:
-                    # Prepare objects for deletion
-                    objects_to_delete = []
-                    for obj in page["Contents"]:
-                        objects_to_delete.append({"Key": obj["Key"]})
-                    
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix, PaginationConfig={"PageSize": 1000}):
+                    objects_to_delete = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
                     if objects_to_delete:
-                        # Delete objects in batches (max 1000 per request)
-                        response = self.client.delete_objects(
-                            Bucket=self.bucket,
-                            Delete={"Objects": objects_to_delete}
-                        )
-                        
-                        deleted_count += len(response.get("Deleted", []))
-                        
-                        # Log any errors
-                        if "Errors" in response:
-                            for error in response["Errors"]:
-                                logger.error(f"Failed to delete {error['Key']}: {error['Message']}")
+                        pending.append(executor.submit(delete_page, objects_to_delete))
+                    if len(pending) >= 2 * max_concurrency:
+                        deleted_count += pending.popleft().result()
+                deleted_count += sum(future.result() for future in pending)
             
-            logger.info(f"Successfully deleted {deleted_count} files from S3")
+            logger.info("Successfully deleted %s files from S3", deleted_count)
             return deleted_count
             
         except Exception as e:
-            logger.error(f"Failed to delete all files from S3: {str(e)}")
+            logger.error("Failed to delete all files from S3: %s", e)
             raise
\ No newline at end of file
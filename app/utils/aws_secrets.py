@@ -1,20 +1,59 @@
-import boto3
 import json
 import os
+import time
 import logging
-from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Fetched secrets are reused across restarts for this many seconds; 0 disables the cache
+SECRETS_CACHE_TTL = float(os.getenv("AWS_SECRETS_CACHE_TTL", "900"))
+SECRETS_CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "rmgx")
+
 class AWSSecretsManager:
-    def __init__(self, secret_name: str = "rmgx-secrets", region_name: str = "ap-south-1"):
+    def __init__(self, secret_name: str = "rmgx-secrets", region_name: str = "ap-south-1",
+                 cache_ttl: float = SECRETS_CACHE_TTL):
         self.secret_name = secret_name
         self.region_name = region_name
+        self.cache_ttl = cache_ttl
+        self.cache_path = os.path.join(SECRETS_CACHE_DIR, f"{secret_name}.json")
         self.client = None
+        self.client_error = None  # botocore ClientError, set once boto3 is imported
+
+    def _read_cache(self) -> Optional[Dict[str, str]]:
+        """Return cached secrets if the cache file is younger than the TTL"""
+        if self.cache_ttl <= 0:
+            return None
+        try:
+            if time.time() - os.path.getmtime(self.cache_path) > self.cache_ttl:
+                return None
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, secrets: Dict[str, str]) -> None:
+        """Atomically write secrets to a file readable only by the current user"""
+        if self.cache_ttl <= 0:
+            return
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(SECRETS_CACHE_DIR, mode=0o700, exist_ok=True)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(secrets, f)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not cache secrets at %s: %s", self.cache_path, e)
 
     def _initialize_client(self):
         """Initialize AWS Secrets Manager client"""
+        # Imported here so boto3 is only loaded when secrets are actually fetched
+        import boto3
+        from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
+        self.client_error = ClientError
+
         try:
             session = boto3.session.Session()
             self.client = session.client(
@@ -23,22 +62,30 @@ class AWSSecretsManager:
             )
             return True
         except (NoCredentialsError, PartialCredentialsError) as e:
-            logger.warning(f"AWS credentials not found or incomplete: {str(e)}")
+            logger.warning("AWS credentials not found or incomplete: %s", e)
             return False
         except Exception as e:
-            logger.warning(f"Failed to initialize AWS Secrets Manager client: {str(e)}")
+            logger.warning("Failed to initialize AWS Secrets Manager client: %s", e)
             return False
 
     def fetch_secrets(self) -> Optional[Dict[str, str]]:
         """
         Fetch secrets from AWS Secrets Manager
         Returns dictionary of secrets if successful, None if failed
+
+        A fresh on-disk copy from a previous start is used when available,
+        skipping client construction and the remote call entirely.
         """
+        cached = self._read_cache()
+        if cached is not None:
+            logger.info("Loaded %s secrets from cache: %s", len(cached), self.cache_path)
+            return cached
+
         if not self._initialize_client():
             return None
 
         try:
-            logger.info(f"Attempting to fetch secrets from AWS Secrets Manager: {self.secret_name}")
+            logger.info("Attempting to fetch secrets from AWS Secrets Manager: %s", self.secret_name)
 
             get_secret_value_response = self.client.get_secret_value(
                 SecretId=self.secret_name
@@ -49,14 +96,16 @@ class AWSSecretsManager:
             # Parse the secret string (assuming it's JSON format)
             try:
                 secrets = json.loads(secret_string)
-                logger.info(f"Successfully fetched {len(secrets)} secrets from AWS Secrets Manager")
-                return secrets
+                logger.info("Successfully fetched %s secrets from AWS Secrets Manager", len(secrets))
             except json.JSONDecodeError:
                 # If it's not JSON, treat it as a single secret
                 logger.info("Fetched single secret value from AWS Secrets Manager")
-                return {"SECRET_VALUE": secret_string}
+                secrets = {"SECRET_VALUE": secret_string}
+
+            self._write_cache(secrets)
+            return secrets
 
-        except ClientError as e:
+        except self.client_error as e:
             error_code = e.response['Error']['Code']
             if error_code == 'DecryptionFailureException':
                 logger.error("Secrets Manager can't decrypt the protected secret text using the provided KMS key.")
@@ -67,11 +116,11 @@ class AWSSecretsManager:
             elif error_code == 'InvalidRequestException':
                 logger.error("Invalid request to Secrets Manager.")
             elif error_code == 'ResourceNotFoundException':
-                logger.warning(f"Secret '{self.secret_name}' not found in AWS Secrets Manager.")
+                logger.warning("Secret '%s' not found in AWS Secrets Manager.", self.secret_name)
             else:
-                logger.error(f"AWS Secrets Manager error: {str(e)}")
+                logger.error("AWS Secrets Manager error: %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error fetching secrets from AWS Secrets Manager: {str(e)}")
+            logger.error("Unexpected error fetching secrets from AWS Secrets Manager: %s", e)
 
         return None
 
@@ -79,7 +128,7 @@ class AWSSecretsManager:
         """Set environment variables from fetched secrets"""
         for key, value in secrets.items():
             os.environ[key] = str(value)
-            logger.debug(f"Set environment variable: {key}")
+            logger.debug("Set environment variable: %s", key)
 
 def load_secrets_with_fallback() -> bool:
     """
@@ -1,49 +1,67 @@
 import os
 import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from from_root import from_root
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+# from_root() walks up the directory tree, so resolve the data paths once
+DATA_DIR = os.path.join(from_root(), "data")
+# Deliberately not cleaned up at startup:
+# - data/bm25 holds BM25 statistics for the vectors in Pinecone, which a
+#   restart does not delete; /reset clears both together.
+# - data/cache holds parsed chunks and embeddings keyed by content hash (and
+#   chunk settings or model), so entries stay correct whatever is indexed and
+#   only make re-uploading the same PDF cheaper; both caches are size-bounded.
+CLEANUP_DIRS = (
+    ("PDF uploads", os.path.join(DATA_DIR, "uploads")),
+    ("ChromaDB", os.path.join(DATA_DIR, "chroma")),
+    ("Index", os.path.join(DATA_DIR, "index")),
+)
+
+
+def _has_entries(path: str) -> bool:
+    """Return True if path is a directory with at least one entry."""
+    try:
+        with os.scandir(path) as entries:
+            return next(entries, None) is not None
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
 def cleanup_all_data():
     """
     Remove all existing PDF files and ChromaDB data for a fresh start.
     This function is called automatically when the application starts.
+    See CLEANUP_DIRS for the data directories that are kept.
     """
     logger.info("Starting automatic startup cleanup...")
     
     try:
-        # Clean up PDF uploads
-        upload_dir = os.path.join(from_root(), "data", "uploads")
-        if os.path.exists(upload_dir):
-            logger.info(f"Removing PDF uploads directory: {upload_dir}")
-            shutil.rmtree(upload_dir)
-            logger.info("PDF uploads directory removed successfully")
-        else:
-            logger.info("PDF uploads directory doesn't exist, skipping...")
-        
-        # Clean up ChromaDB data
-        chroma_dir = os.path.join(from_root(), "data", "chroma")
-        if os.path.exists(chroma_dir):
-            logger.info(f"Removing ChromaDB directory: {chroma_dir}")
-            shutil.rmtree(chroma_dir)
-            logger.info("ChromaDB directory removed successfully")
-        else:
-            logger.info("ChromaDB directory doesn't exist, skipping...")
-        
-        # Clean up index directory (if exists)
-        index_dir = os.path.join(from_root(), "data", "index")
-        if os.path.exists(index_dir):
-            logger.info(f"Removing index directory: {index_dir}")
-            shutil.rmtree(index_dir)
-            logger.info("Index directory removed successfully")
-        else:
-            logger.info("Index directory doesn't exist, skipping...")
+        to_remove = []
+        for label, path in CLEANUP_DIRS:
+            if _has_entries(path):
+                logger.info("Removing %s directory: %s", label, path)
+                to_remove.append((label, path))
+            else:
+                logger.info("%s directory doesn't exist or is empty, skipping...", label)
+
+        if not to_remove:
+            logger.info("Nothing to clean up")
+            return True
+
+        # The directories are independent subtrees, so delete them concurrently
+        with ThreadPoolExecutor(max_workers=len(to_remove)) as executor:
+            futures = [(label, executor.submit(shutil.rmtree, path)) for label, path in to_remove]
+            for label, future in futures:
+                future.result()
+                logger.info("%s directory removed successfully", label)
         
         logger.info("Automatic startup cleanup completed successfully! All data has been removed.")
         return True
         
     except Exception as e:
-        logger.error(f"Error during automatic startup cleanup: {str(e)}")
+        logger.error("Error during automatic startup cleanup: %s", e)
         raise
@@ -1,43 +1,111 @@
 import os
 import logging
 from fastapi import UploadFile
-import shutil
+import aiofiles
+import hashlib
+import tempfile
 import uuid
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = "data/uploads"
+# Copy in 4MB reads, so large PDFs take a few dozen read/write calls rather than hundreds
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
 
-def save_pdf_file(file: UploadFile) -> dict:
-    """Save uploaded PDF to the uploads folder with a unique filename and return file info."""
-    logger.info(f"Saving uploaded file: {file.filename}")
+
+def _ensure_upload_dir() -> None:
+    """
+    Create UPLOAD_DIR if it is missing. Checked on every save rather than once
+    at import, because the directory can be removed while the process runs
+    (e.g. by the startup cleanup); makedirs is one cheap call next to the write.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+async def _stream_to_file(file: UploadFile, path: str) -> str:
+    """
+    Write the upload to path in COPY_BUFFER_SIZE chunks and return the SHA-256
+    of its content, computed while streaming.
+
+    UploadFile.read serves in-memory spools directly and moves reads of
+    spooled-to-disk uploads to a thread, and aiofiles does the same for
+    writes, so the event loop is never blocked.
+    """
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "wb") as buffer:
+        while chunk := await file.read(COPY_BUFFER_SIZE):
+            digest.update(chunk)
+            await buffer.write(chunk)
+    return digest.hexdigest()
+
+
+async def save_temp_pdf_file(file: UploadFile) -> dict:
+    """
+    Stream an uploaded PDF to a private temporary file for processing and
+    return its path and content hash. The caller deletes the file when done;
+    the hash identifies the content for the chunk cache and storage keys.
+    """
+    fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        content_hash = await _stream_to_file(file, temp_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    logger.debug("Upload %s streamed to %s", file.filename, temp_path)
+    return {
+        "file_path": temp_path,
+        "original_filename": file.filename,
+        "content_hash": content_hash
+    }
+
+
+async def save_pdf_file(file: UploadFile) -> dict:
+    """
+    Save uploaded PDF to the uploads folder under its content hash and return file info.
+
+    The upload is streamed as in _stream_to_file. The SHA-256 of the content is
+    computed while streaming, so re-uploading an identical PDF resolves to the
+    file already on disk.
+    """
+    logger.info("Saving uploaded file: %s", file.filename)
     
     try:
-        if not os.path.exists(UPLOAD_DIR):
-            logger.debug(f"Creating upload directory: {UPLOAD_DIR}")
-            os.makedirs(UPLOAD_DIR)
+        _ensure_upload_dir()
 
         _, ext = os.path.splitext(file.filename)
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        logger.debug(f"Generated unique filename: {unique_filename}")
-        logger.debug(f"Full file path: {file_path}")
-        logger.debug(f"Original filename: {file.filename}")
+        # Stream to a temporary name first; the final name is only known once hashed
+        temp_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.part")
+        try:
+            content_hash = await _stream_to_file(file, temp_path)
+
+            unique_filename = f"{content_hash}{ext}"
+            file_path = os.path.join(UPLOAD_DIR, unique_filename)
+            logger.debug("Content-hash filename: %s", unique_filename)
+            logger.debug("Original filename: %s", file.filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            if os.path.exists(file_path):
+                logger.info("Identical file already saved at: %s", file_path)
+                os.unlink(temp_path)
+            else:
+                os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
         
-        logger.info(f"File saved successfully at: {file_path}")
+        logger.info("File saved successfully at: %s", file_path)
         
         # Return both file path and original filename
         return {
             "file_path": file_path,
             "original_filename": file.filename,
-            "unique_filename": unique_filename
+            "unique_filename": unique_filename,
+            "content_hash": content_hash
         }
         
     except Exception as e:
-        logger.error(f"Failed to save file {file.filename}: {str(e)}")
+        logger.error("Failed to save file %s: %s", file.filename, e)
         raise
@@ -1,7 +1,9 @@
+import atexit
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from from_root import from_root
 from datetime import datetime
 
@@ -16,16 +18,30 @@ log_dir_path = os.path.join(from_root(), LOG_DIR)
 os.makedirs(log_dir_path, exist_ok=True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
+# Background thread writing queued records to the log file; kept here so it is not collected
+_queue_listener = None
+
+# Handlers installed by configure_logger, and the thread draining records from pool workers
+_handlers = ()
+_worker_listener = None
+
 def configure_logger():
     """
     Configures logging with a rotating file handler and a console handler.
+
+    File writes (and rollovers) happen on a QueueListener thread; request
+    threads only enqueue the record.
     """
+    global _queue_listener, _handlers
+
     # Get the root logger
     logger = logging.getLogger()
     
     # Clear any existing handlers to avoid duplicates
     if logger.handlers:
         logger.handlers.clear()
+    if _queue_listener is not None:
+        _queue_listener.stop()
     
     logger.setLevel(logging.DEBUG)
     
@@ -51,14 +67,50 @@ def configure_logger():
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.INFO)
     
+    # Queue in front of the file handler; the listener drains it and flushes on exit
+    log_queue = queue.Queue(-1)
+    _queue_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+
     # Add handlers to the logger
-    logger.addHandler(file_handler)
+    logger.addHandler(QueueHandler(log_queue))
     logger.addHandler(console_handler)
+    _handlers = (file_handler, console_handler)
     
     # Prevent propagation to avoid duplicate logs
     logger.propagate = False
     
     return logger
 
+def start_worker_logging(mp_context):
+    """
+    Create the queue that process-pool workers log into.
+
+    Worker processes do not share this process's handlers or its in-memory
+    queue, so they put records on a multiprocessing queue instead and a
+    listener thread here writes them through the same file and console
+    handlers. Pass the queue to configure_worker_logger as the pool's
+    initializer argument.
+    """
+    global _worker_listener
+
+    if _worker_listener is not None:
+        _worker_listener.stop()
+
+    log_queue = mp_context.Queue(-1)
+    _worker_listener = QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    _worker_listener.start()
+    atexit.register(_worker_listener.stop)
+    return log_queue
+
+def configure_worker_logger(log_queue):
+    """Pool initializer: send every record from a worker process to the parent's log queue"""
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+
 # Don't auto-configure on import for FastAPI apps
 # configure_logger()
\ No newline at end of file
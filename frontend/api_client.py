@@ -1,18 +1,29 @@
-import requests
+import httpx
+import json
 import streamlit as st
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator, List, Dict, Any, Optional, Union
 from config import config
 
+try:
+    # With h2 installed httpx negotiates HTTP/2, multiplexing requests over one connection
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:  # HTTP/1.1 with keep-alive
+    HTTP2_ENABLED = False
+
 class APIClient:
     """Client for communicating with the PDF RAG backend API"""
 
     def __init__(self):
         self.base_url = config.API_BASE_URL.rstrip('/')
         self.timeout = config.REQUEST_TIMEOUT
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'PDF-RAG-Frontend/1.0'
-        })
+        # One pooled client for every call, so connections (and TLS sessions) are reused
+        self.session = httpx.Client(
+            http2=HTTP2_ENABLED,
+            timeout=self.timeout,
+            headers={'User-Agent': 'PDF-RAG-Frontend/1.0'}
+        )
 
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Make HTTP request to backend API"""
@@ -25,26 +36,51 @@ class APIClient:
             response = self.session.request(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             st.error(f"API Request failed: {str(e)}")
             raise
 
-    def health_check(self) -> Dict[str, Any]:
+    def health_check(self, timeout: Optional[float] = None) -> Dict[str, Any]:
         """Check backend health"""
-        return self._make_request("GET", "/health")
+        return self._make_request("GET", "/health", timeout=timeout or self.timeout)
 
     def get_status(self) -> Dict[str, Any]:
         """Get system status"""
         return self._make_request("GET", "/status")
 
-    def upload_files(self, files: List[bytes], filenames: List[str]) -> Dict[str, Any]:
-        """Upload PDF files to backend"""
-        files_data = []
-        for file_bytes, filename in zip(files, filenames):
-            files_data.append(("files", (filename, file_bytes, "application/pdf")))
+    def _post_upload(self, batch: List[tuple]) -> Dict[str, Any]:
+        """Post one group of files; runs on worker threads, so errors are raised, not shown"""
+        files_data = [("files", (filename, file, "application/pdf")) for file, filename in batch]
+        response = self.session.post(f"{self.base_url}/api/upload", files=files_data)
+        response.raise_for_status()
+        return response.json()
+
+    def upload_files(self, files: List[Union[bytes, BinaryIO]], filenames: List[str]) -> Dict[str, Any]:
+        """
+        Upload PDF files to backend.
+
+        Files may be bytes or open binary file objects; file objects are
+        streamed from their current position instead of being copied into
+        memory first. Large selections are split into groups of
+        UPLOAD_BATCH_SIZE files posted in parallel and the responses merged.
+        """
+        pairs = list(zip(files, filenames))
+        batch_size = config.UPLOAD_BATCH_SIZE
+        batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+
+        try:
+            if len(batches) <= 1:
+                return self._post_upload(pairs)
+            with ThreadPoolExecutor(max_workers=min(config.UPLOAD_CONCURRENCY, len(batches))) as executor:
+                responses = list(executor.map(self._post_upload, batches))
+        except httpx.HTTPError as e:
+            st.error(f"API Request failed: {str(e)}")
+            raise
 
-        response = self._make_request("POST", "/api/upload", files=files_data)
-        return response
+        merged = dict(responses[0])
+        merged["uploaded_files"] = [name for response in responses for name in response.get("uploaded_files", [])]
+        merged["total_chunks"] = sum(response.get("total_chunks", 0) for response in responses)
+        return merged
 
     def get_uploaded_files(self) -> Dict[str, Any]:
         """Get list of uploaded files"""
@@ -55,6 +91,11 @@ class APIClient:
         data = {"s3_key": s3_key}
         return self._make_request("DELETE", "/api/delete", json=data)
 
+    def delete_files(self, s3_keys: List[str]) -> Dict[str, Any]:
+        """Delete several files by S3 key in one request"""
+        data = {"s3_keys": s3_keys}
+        return self._make_request("DELETE", "/api/delete/batch", json=data)
+
     def reset_index(self) -> Dict[str, Any]:
         """Reset entire index"""
         data = {"confirm": True}
@@ -68,6 +109,25 @@ class APIClient:
         }
         return self._make_request("POST", "/api/chat", json=data)
 
+    def chat_stream(self, query: str, session_id: str = "default") -> Iterator[Dict[str, Any]]:
+        """
+        Send chat query to the streaming endpoint, yielding its server-sent
+        events ("token", then "sources" or "error") as they arrive
+        """
+        data = {
+            "query": query,
+            "session_id": session_id
+        }
+        try:
+            with self.session.stream("POST", f"{self.base_url}/api/chat/stream", json=data) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line.startswith("data: "):
+                        yield json.loads(line[len("data: "):])
+        except httpx.HTTPError as e:
+            st.error(f"API Request failed: {str(e)}")
+            raise
+
     def test_connection(self) -> bool:
         """Test connection to backend"""
         try:
@@ -76,5 +136,11 @@ class APIClient:
         except:
             return False
 
-# Global API client instance
-api_client = APIClient()
+@st.cache_resource
+def get_api_client() -> APIClient:
+    """
+    Shared API client, created on first use rather than at import. Held by
+    Streamlit's resource cache so its keep-alive connection pool also
+    survives module reloads during development.
+    """
+    return APIClient()
@@ -5,7 +5,8 @@ from dotenv import load_dotenv
 from components.chat_interface import render_chat_interface
 from components.file_uploader import render_file_uploader
 from components.file_manager import render_file_manager
-from api_client import api_client
+from api_client import get_api_client
+from utils.helpers import get_answer_cache
 from config import config
 
 # Load environment variables
@@ -19,8 +20,14 @@ st.set_page_config(
     initial_sidebar_state=config.SIDEBAR_STATE
 )
 
+@st.cache_data(ttl=config.HEALTH_CHECK_TTL, show_spinner=False)
+def cached_health_check(base_url: str) -> dict:
+    """Backend health, reused across reruns; keyed by URL so a change re-checks"""
+    return get_api_client().health_check(timeout=config.HEALTH_CHECK_TIMEOUT)
+
 def main():
     """Main Streamlit application"""
+    api_client = get_api_client()
 
     # Title and description
     st.title("📚 PDF RAG Chatbot")
@@ -45,7 +52,7 @@ def main():
 
         # Backend connection status
         try:
-            status = api_client.health_check()
+            status = cached_health_check(api_client.base_url)
             if status.get("status") == "ok":
                 st.success("✅ Backend Connected")
             else:
@@ -155,6 +162,14 @@ def main():
                 st.session_state.current_session_id = new_session_id
                 st.rerun()
 
+            # Answer cache effectiveness
+            cache_stats = get_answer_cache().stats()
+            st.caption(
+                f"⚡ Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+                f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+                f"{cache_stats['stored']} stored"
+            )
+
 
     # Main content based on selected tab
     if tab == "Chat":
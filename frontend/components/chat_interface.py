@@ -1,21 +1,230 @@
+import functools
 import streamlit as st
 from typing import Dict, Any, List
-from api_client import api_client
+from api_client import get_api_client
+from utils.answer_cache import corpus_versions
+from utils.helpers import cached_uploaded_files, get_answer_cache
 from config import config
 from datetime import datetime
 
+# Chat bubble, typing indicator and scrollbar styles
+CHAT_STYLES = """
+<style>
+    .chat-messages {
+        max-height: 70vh;
+        overflow-y: auto;
+        padding: 20px;
+        background: #ffffff;
+        border-radius: 15px;
+        margin: 15px 0;
+        border: 1px solid #e9ecef;
+        scroll-behavior: smooth;
+    }
+    .message-bubble {
+        max-width: 75%;
+        padding: 14px 18px;
+        border-radius: 20px;
+        margin: 6px 0;
+        position: relative;
+        word-wrap: break-word;
+        line-height: 1.5;
+        font-size: 15px;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
+    }
+    .user-message {
+        background: linear-gradient(135deg, #007bff, #0056b3);
+        color: white;
+        margin-left: auto;
+        border-bottom-right-radius: 6px;
+        animation: slideInRight 0.3s ease-out;
+    }
+    .assistant-message {
+        background: #f8f9fa;
+        color: #2c3e50;
+        border: 1px solid #e9ecef;
+        border-bottom-left-radius: 6px;
+        animation: slideInLeft 0.3s ease-out;
+    }
+    .timestamp {
+        font-size: 0.7em;
+        opacity: 0.6;
+        margin-top: 6px;
+        font-weight: 500;
+    }
+    .message-row {
+        display: flex;
+        align-items: flex-start;
+        margin: 12px 0;
+    }
+    .message-row.user { justify-content: flex-end; }
+    .message-row.assistant { justify-content: flex-start; }
+    .avatar {
+        width: 36px;
+        height: 36px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        margin-right: 12px;
+        font-size: 16px;
+        flex-shrink: 0;
+    }
+    .typing-indicator {
+        display: inline-flex;
+        align-items: center;
+        padding: 14px 18px;
+        background: #f8f9fa;
+        border-radius: 20px;
+        border-bottom-left-radius: 6px;
+        font-style: italic;
+        color: #666;
+        border: 1px solid #e9ecef;
+        animation: pulse 1.5s infinite;
+    }
+    .typing-dots {
+        display: inline-flex;
+        gap: 4px;
+        margin-left: 8px;
+    }
+    .typing-dots span {
+        width: 4px;
+        height: 4px;
+        background: #666;
+        border-radius: 50%;
+        animation: typing 1.4s infinite ease-in-out;
+    }
+    .typing-dots span:nth-child(2) { animation-delay: 0.2s; }
+    .typing-dots span:nth-child(3) { animation-delay: 0.4s; }
+
+    @keyframes slideInRight {
+        from { opacity: 0; transform: translateX(30px); }
+        to { opacity: 1; transform: translateX(0); }
+    }
+    @keyframes slideInLeft {
+        from { opacity: 0; transform: translateX(-30px); }
+        to { opacity: 1; transform: translateX(0); }
+    }
+    @keyframes pulse {
+        0%, 100% { opacity: 1; }
+        50% { opacity: 0.7; }
+    }
+    @keyframes typing {
+        0%, 60%, 100% { transform: translateY(0); }
+        30% { transform: translateY(-10px); }
+    }
+
+    /* Scrollbar styling */
+    .chat-messages::-webkit-scrollbar {
+        width: 6px;
+    }
+    .chat-messages::-webkit-scrollbar-track {
+        background: #f1f1f1;
+        border-radius: 10px;
+    }
+    .chat-messages::-webkit-scrollbar-thumb {
+        background: #c1c1c1;
+        border-radius: 10px;
+    }
+    .chat-messages::-webkit-scrollbar-thumb:hover {
+        background: #a8a8a8;
+    }
+</style>
+"""
+
+# Shown in place of the assistant bubble until the first token arrives
+TYPING_INDICATOR = """
+<div class="message-row assistant">
+    <div class="avatar" style="background: linear-gradient(135deg, #10a37f, #0d8a6a); color: white;">🤖</div>
+    <div class="typing-indicator">
+        Assistant is thinking
+        <div class="typing-dots">
+            <span></span>
+            <span></span>
+            <span></span>
+        </div>
+    </div>
+</div>
+"""
+
+def user_bubble(content: str, timestamp: str) -> str:
+    """HTML for a user chat bubble"""
+    return f"""
+    <div class="message-row user">
+        <div style="flex: 1;"></div>
+        <div class="message-bubble user-message">
+            {content}
+            <div class="timestamp">{timestamp}</div>
+        </div>
+    </div>
+    """
+
+def assistant_bubble(content: str, timestamp: str) -> str:
+    """HTML for an assistant chat bubble"""
+    return f"""
+    <div class="message-row assistant">
+        <div class="avatar" style="background: linear-gradient(135deg, #10a37f, #0d8a6a); color: white;">🤖</div>
+        <div class="message-bubble assistant-message">
+            {content}
+            <div class="timestamp">{timestamp}</div>
+        </div>
+    </div>
+    """
+
+@functools.lru_cache(maxsize=512)
+def render_bubble_html(role: str, content: str, timestamp: str) -> str:
+    """
+    Bubble HTML for a stored message, memoized since history messages never
+    change; the live streaming bubble calls assistant_bubble directly instead
+    """
+    if role == "user":
+        return user_bubble(content, timestamp)
+    return assistant_bubble(content, timestamp)
+
+def source_block(number: int, source: Dict[str, Any]) -> str:
+    """HTML for one cited source: its title line and the relevant text, if any"""
+    title = f"📄 Source {number}: {source['pdf_name']} (Page {source.get('page_number', 'N/A')})"
+    relevant_text = source.get('relevant_text', '')
+    if not relevant_text:
+        return f"""
+    <div style="margin: 8px 0; font-weight: 600;">{title}</div>
+    """
+    return f"""
+    <div style="margin: 8px 0; font-weight: 600;">{title}</div>
+    <div style="
+        background: #f8f9fa;
+        padding: 12px;
+        border-radius: 8px;
+        border-left: 4px solid #007bff;
+        margin: 8px 0;
+        line-height: 1.6;
+        font-size: 0.9em;
+    ">
+        {relevant_text}
+    </div>
+    """
+
+def toggle_state(key: str) -> None:
+    """Flip a boolean in session state; used as a button callback"""
+    st.session_state[key] = not st.session_state.get(key, False)
+
 def render_chat_interface():
     """Render a modern WhatsApp/ChatGPT-style chat interface with navigation"""
+    api_client = get_api_client()
 
     # Initialize typing state
     if "is_typing" not in st.session_state:
         st.session_state.is_typing = False
 
+    # Cache of answers to repeated questions, keyed by chat session
+    answer_cache = get_answer_cache()
+
     # Check if there are uploaded files
     try:
-        files_response = api_client.get_uploaded_files()
+        files_response = cached_uploaded_files(api_client.base_url)
         total_files = files_response.get("total_files", 0)
         has_files = total_files > 0
+        # Answers are only valid for the file contents they were retrieved from
+        answer_cache.sync_corpus(corpus_versions(files_response))
     except Exception as e:
         st.error(f"Failed to check uploaded files: {str(e)}")
         has_files = False
@@ -57,128 +266,7 @@ def render_chat_interface():
 
 
     # Enhanced Chat Styling
-    st.markdown("""
-    <style>
-        .chat-messages {
-            max-height: 70vh;
-            overflow-y: auto;
-            padding: 20px;
-            background: #ffffff;
-            border-radius: 15px;
-            margin: 15px 0;
-            border: 1px solid #e9ecef;
-            scroll-behavior: smooth;
-        }
-        .message-bubble {
-            max-width: 75%;
-            padding: 14px 18px;
-            border-radius: 20px;
-            margin: 6px 0;
-            position: relative;
-            word-wrap: break-word;
-            line-height: 1.5;
-            font-size: 15px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-        }
-        .user-message {
-            background: linear-gradient(135deg, #007bff, #0056b3);
-            color: white;
-            margin-left: auto;
-            border-bottom-right-radius: 6px;
-            animation: slideInRight 0.3s ease-out;
-        }
-        .assistant-message {
-            background: #f8f9fa;
-            color: #2c3e50;
-            border: 1px solid #e9ecef;
-            border-bottom-left-radius: 6px;
-            animation: slideInLeft 0.3s ease-out;
-        }
-        .timestamp {
-            font-size: 0.7em;
-            opacity: 0.6;
-            margin-top: 6px;
-            font-weight: 500;
-        }
-        .message-row {
-            display: flex;
-            align-items: flex-start;
-            margin: 12px 0;
-        }
-        .message-row.user { justify-content: flex-end; }
-        .message-row.assistant { justify-content: flex-start; }
-        .avatar {
-            width: 36px;
-            height: 36px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            margin-right: 12px;
-            font-size: 16px;
-            flex-shrink: 0;
-        }
-        .typing-indicator {
-            display: inline-flex;
-            align-items: center;
-            padding: 14px 18px;
-            background: #f8f9fa;
-            border-radius: 20px;
-            border-bottom-left-radius: 6px;
-            font-style: italic;
-            color: #666;
-            border: 1px solid #e9ecef;
-            animation: pulse 1.5s infinite;
-        }
-        .typing-dots {
-            display: inline-flex;
-            gap: 4px;
-            margin-left: 8px;
-        }
-        .typing-dots span {
-            width: 4px;
-            height: 4px;
-            background: #666;
-            border-radius: 50%;
-            animation: typing 1.4s infinite ease-in-out;
-        }
-        .typing-dots span:nth-child(2) { animation-delay: 0.2s; }
-        .typing-dots span:nth-child(3) { animation-delay: 0.4s; }
-
-        @keyframes slideInRight {
-            from { opacity: 0; transform: translateX(30px); }
-            to { opacity: 1; transform: translateX(0); }
-        }
-        @keyframes slideInLeft {
-            from { opacity: 0; transform: translateX(-30px); }
-            to { opacity: 1; transform: translateX(0); }
-        }
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.7; }
-        }
-        @keyframes typing {
-            0%, 60%, 100% { transform: translateY(0); }
-            30% { transform: translateY(-10px); }
-        }
-
-        /* Scrollbar styling */
-        .chat-messages::-webkit-scrollbar {
-            width: 6px;
-        }
-        .chat-messages::-webkit-scrollbar-track {
-            background: #f1f1f1;
-            border-radius: 10px;
-        }
-        .chat-messages::-webkit-scrollbar-thumb {
-            background: #c1c1c1;
-            border-radius: 10px;
-        }
-        .chat-messages::-webkit-scrollbar-thumb:hover {
-            background: #a8a8a8;
-        }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(CHAT_STYLES, unsafe_allow_html=True)
 
     # Chat Messages Container
     st.markdown('<div class="chat-messages">', unsafe_allow_html=True)
@@ -219,124 +307,49 @@ def render_chat_interface():
             </style>
             """, unsafe_allow_html=True)
         else:
-            # Display messages
-            for i, message in enumerate(current_messages):
-                timestamp = message.get('timestamp', datetime.now()).strftime("%H:%M")
-
-                if message["role"] == "user":
-                    st.markdown(f"""
-                    <div class="message-row user">
-                        <div style="flex: 1;"></div>
-                        <div class="message-bubble user-message">
-                            {message['content']}
-                            <div class="timestamp">{timestamp}</div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    # Assistant message with sources
-                    st.markdown(f"""
-                    <div class="message-row assistant">
-                        <div class="avatar" style="background: linear-gradient(135deg, #10a37f, #0d8a6a); color: white;">🤖</div>
-                        <div class="message-bubble assistant-message">
-                            {message['content']}
-                            <div class="timestamp">{timestamp}</div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    # Display sources inline
-                    if message.get("sources"):
-                        sources = message["sources"]
-                        for j, source in enumerate(sources[:config.MAX_SOURCES_DISPLAY], 1):
-                            with st.expander(f"📄 Source {j}: {source['pdf_name']} (Page {source.get('page_number', 'N/A')})", expanded=False):
-                                relevant_text = source.get('relevant_text', '')
-                                if relevant_text:
-                                    st.markdown(f"""
-                                    <div style="
-                                        background: #f8f9fa;
-                                        padding: 12px;
-                                        border-radius: 8px;
-                                        border-left: 4px solid #007bff;
-                                        margin: 8px 0;
-                                        line-height: 1.6;
-                                        font-size: 0.9em;
-                                    ">
-                                        {relevant_text}
-                                    </div>
-                                    """, unsafe_allow_html=True)
+            # Render only the latest window of messages so rerun cost doesn't grow with history
+            visible_counts = st.session_state.setdefault("visible_counts", {})
+            visible_count = visible_counts.get(st.session_state.current_session_id, config.CHAT_HISTORY_WINDOW)
+            first_visible = max(0, len(current_messages) - visible_count)
+            if first_visible and st.button(f"⬆️ Load older messages ({first_visible} hidden)", key="load_older_messages"):
+                visible_counts[st.session_state.current_session_id] = visible_count + config.CHAT_HISTORY_WINDOW
+                st.rerun()
+            sources_from = len(current_messages) - config.SOURCES_RECENT_MESSAGES
+
+            # Display messages: consecutive bubbles are joined into one markdown
+            # element, flushed only where a sources toggle must sit in between
+            html_parts = []
+            for i, message in enumerate(current_messages[first_visible:], first_visible):
+                html_parts.append(render_bubble_html(message["role"], message['content'], message['timestamp']))
+
+                # Sources for recent assistant messages are rendered only once opened
+                if message["role"] == "assistant" and i >= sources_from and message.get("sources"):
+                    st.markdown("".join(html_parts), unsafe_allow_html=True)
+                    html_parts = []
+                    sources = message["sources"][:config.MAX_SOURCES_DISPLAY]
+                    state_key = f"sources_open_{st.session_state.current_session_id}_{i}"
+                    is_open = st.session_state.get(state_key, False)
+                    st.button(
+                        f"📚 {'Hide' if is_open else 'Show'} sources ({len(sources)})",
+                        key=f"sources_{st.session_state.current_session_id}_{i}",
+                        on_click=toggle_state,
+                        args=(state_key,)
+                    )
+                    if is_open:
+                        st.markdown("".join(
+                            source_block(j, source) for j, source in enumerate(sources, 1)
+                        ), unsafe_allow_html=True)
+
+            if html_parts:
+                st.markdown("".join(html_parts), unsafe_allow_html=True)
 
         # Enhanced Typing indicator
         if st.session_state.is_typing:
-            st.markdown("""
-            <div class="message-row assistant">
-                <div class="avatar" style="background: linear-gradient(135deg, #10a37f, #0d8a6a); color: white;">🤖</div>
-                <div class="typing-indicator">
-                    Assistant is thinking
-                    <div class="typing-dots">
-                        <span></span>
-                        <span></span>
-                        <span></span>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(TYPING_INDICATOR, unsafe_allow_html=True)
 
     # Close chat messages container
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Message Input Area (Fixed at bottom)
-    st.markdown("""
-    <style>
-        .message-input-container {
-            position: fixed;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            background: white;
-            padding: 20px;
-            border-top: 1px solid #e9ecef;
-            box-shadow: 0 -2px 10px rgba(0,0,0,0.1);
-            z-index: 1000;
-        }
-        .message-input {
-            display: flex;
-            gap: 10px;
-            align-items: center;
-        }
-        .message-textarea {
-            flex: 1;
-            padding: 12px 16px;
-            border: 2px solid #e9ecef;
-            border-radius: 25px;
-            font-size: 16px;
-            resize: none;
-            outline: none;
-            transition: border-color 0.3s;
-        }
-        .message-textarea:focus {
-            border-color: #007bff;
-        }
-        .send-button {
-            background: linear-gradient(135deg, #007bff, #0056b3);
-            color: white;
-            border: none;
-            border-radius: 50%;
-            width: 48px;
-            height: 48px;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 18px;
-            transition: transform 0.2s;
-        }
-        .send-button:hover {
-            transform: scale(1.05);
-        }
-    </style>
-    """, unsafe_allow_html=True)
-
     # Input form
     with st.form(key="message_form", clear_on_submit=True):
         col1, col2 = st.columns([6, 1])
@@ -360,16 +373,38 @@ def render_chat_interface():
             user_message = {
                 "role": "user",
                 "content": query.strip(),
-                "timestamp": datetime.now()
+                # Formatted once here rather than on every rerun
+                "timestamp": datetime.now().strftime("%H:%M")
             }
             st.session_state.chat_sessions[st.session_state.current_session_id]["messages"].append(user_message)
 
             try:
-                # Send query with session ID
-                response = api_client.chat(query.strip(), st.session_state.current_session_id)
+                # Reuse the answer to a repeated question, otherwise stream it with session ID
+                response = answer_cache.get(st.session_state.current_session_id, query)
+                if response is None:
+                    # Show the exchange while tokens arrive; the rerun below redraws it from history
+                    timestamp = user_message["timestamp"]
+                    with chat_container:
+                        st.markdown(user_bubble(query.strip(), timestamp), unsafe_allow_html=True)
+                        answer_placeholder = st.empty()
+                        answer_placeholder.markdown(TYPING_INDICATOR, unsafe_allow_html=True)
+
+                    answer_parts = []
+                    sources = []
+                    for event in api_client.chat_stream(query.strip(), st.session_state.current_session_id):
+                        if event["type"] == "token":
+                            answer_parts.append(event["content"])
+                            answer_placeholder.markdown(assistant_bubble("".join(answer_parts), timestamp), unsafe_allow_html=True)
+                        elif event["type"] == "sources":
+                            sources = event.get("sources", [])
+                        elif event["type"] == "error":
+                            raise RuntimeError(event.get("detail", "Streaming failed"))
+
+                    response = {"answer": "".join(answer_parts), "sources": sources}
+                    answer_cache.put(st.session_state.current_session_id, query, response)
 
                 # Get assistant response
-                answer = response.get("answer", "No answer received")
+                answer = response.get("answer") or "No answer received"
                 sources = response.get("sources", [])
 
                 # Add assistant message
@@ -377,7 +412,7 @@ def render_chat_interface():
                     "role": "assistant",
                     "content": answer,
                     "sources": sources,
-                    "timestamp": datetime.now()
+                    "timestamp": datetime.now().strftime("%H:%M")
                 }
                 st.session_state.chat_sessions[st.session_state.current_session_id]["messages"].append(assistant_message)
 
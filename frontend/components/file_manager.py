@@ -1,14 +1,16 @@
 import streamlit as st
-from api_client import api_client
+from api_client import get_api_client
+from utils.helpers import cached_uploaded_files
 
 def render_file_manager():
     """Render the file management component"""
+    api_client = get_api_client()
 
     st.header("📁 Manage Uploaded Files")
 
     # Get uploaded files
     try:
-        files_response = api_client.get_uploaded_files()
+        files_response = cached_uploaded_files(api_client.base_url)
         files = files_response.get("files", [])
 
         if not files:
@@ -17,30 +19,31 @@ def render_file_manager():
 
         st.success(f"📚 {len(files)} file(s) uploaded")
 
-        # Display files with delete option
+        # Display files with a selection box each; deletes go out as one batch
         st.markdown("### Uploaded Files")
 
+        selected = []
         for file_key in files:
-            col1, col2 = st.columns([4, 1])
-
-            with col1:
-                filename = file_key.split('/')[-1] if '/' in file_key else file_key
-                st.write(f"📄 {filename}")
-
-            with col2:
-                if st.button(f"🗑️ Delete", key=f"delete_{file_key}"):
-                    try:
-                        with st.spinner("Deleting file..."):
-                            response = api_client.delete_file(file_key)
-
-                        if response.get("success"):
-                            st.success(f"✅ {response.get('deleted_file', filename)} deleted successfully")
-                            st.rerun()
-                        else:
-                            st.error("Failed to delete file")
-
-                    except Exception as e:
-                        st.error(f"Delete failed: {str(e)}")
+            filename = file_key.split('/')[-1] if '/' in file_key else file_key
+            if st.checkbox(f"📄 {filename}", key=f"select_{file_key}"):
+                selected.append(file_key)
+
+        if st.button(f"🗑️ Delete Selected ({len(selected)})", disabled=not selected):
+            try:
+                with st.spinner(f"Deleting {len(selected)} file(s)..."):
+                    response = api_client.delete_files(selected)
+
+                if response.get("success"):
+                    st.success(f"✅ {len(response.get('deleted_files', selected))} file(s) deleted successfully")
+                    cached_uploaded_files.clear()
+                    # Which hashes the deleted files had is unknown, so allow every file again
+                    st.session_state.pop("uploaded_hashes", None)
+                    st.rerun()
+                else:
+                    st.error("Failed to delete files")
+
+            except Exception as e:
+                st.error(f"Delete failed: {str(e)}")
 
         # Reset all data option
         st.markdown("---")
@@ -62,6 +65,8 @@ def render_file_manager():
                     if response.get("success"):
                         st.success("✅ Index reset successfully!")
                         st.json(response.get("details", {}))
+                        cached_uploaded_files.clear()
+                        st.session_state.pop("uploaded_hashes", None)
                         st.rerun()
                     else:
                         st.error("Reset failed with some errors")
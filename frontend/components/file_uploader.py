@@ -1,6 +1,8 @@
+import hashlib
 import streamlit as st
 from typing import List
-from api_client import api_client
+from api_client import get_api_client
+from utils.helpers import cached_uploaded_files, format_file_size
 from config import config
 
 def validate_file(file) -> bool:
@@ -9,14 +11,15 @@ def validate_file(file) -> bool:
     if not file.name.lower().endswith('.pdf'):
         return False
 
-    # Check file size
-    if len(file.getvalue()) > config.MAX_FILE_SIZE:
+    # Check file size (UploadedFile knows its size, no need to copy the bytes)
+    if file.size > config.MAX_FILE_SIZE:
         return False
 
     return True
 
 def render_file_uploader():
     """Render the file uploader component"""
+    api_client = get_api_client()
 
     st.header("📤 Upload PDF Documents")
 
@@ -40,34 +43,49 @@ def render_file_uploader():
     if uploaded_files:
         st.markdown(f"**Selected files:** {len(uploaded_files)}")
 
+        # Content hashes of files this session has already uploaded
+        uploaded_hashes = st.session_state.setdefault("uploaded_hashes", set())
+
+        max_size = format_file_size(config.MAX_FILE_SIZE)
+
         # Validate and display file details
         valid_files = []
+        valid_hashes = []
         for file in uploaded_files:
-            file_size_mb = len(file.getvalue()) / (1024 * 1024)
+            file_size = format_file_size(file.size)
+            # Hash the in-memory buffer directly rather than a copy of it
+            digest = hashlib.sha256(file.getbuffer()).hexdigest()
 
             if not validate_file(file):
-                if file_size_mb > config.MAX_FILE_SIZE / (1024 * 1024):
-                    st.error(f"❌ {file.name}: File too large ({file_size_mb:.1f}MB). Max allowed: {config.MAX_FILE_SIZE/(1024*1024)}MB")
+                if file.size > config.MAX_FILE_SIZE:
+                    st.error(f"❌ {file.name}: File too large ({file_size}). Max allowed: {max_size}")
                 else:
                     st.error(f"❌ {file.name}: Invalid file type")
+            elif digest in uploaded_hashes or digest in valid_hashes:
+                st.info(f"ℹ️ {file.name}: Already uploaded, skipping")
             else:
-                st.success(f"✅ {file.name}: {file_size_mb:.1f}MB")
+                st.success(f"✅ {file.name}: {file_size}")
                 valid_files.append(file)
+                valid_hashes.append(digest)
 
         # Upload button
         if valid_files and st.button("🚀 Upload Files", type="primary"):
             # Upload files
             with st.spinner("Uploading and processing files..."):
                 try:
-                    file_bytes = [file.getvalue() for file in valid_files]
+                    # UploadedFile is file-like, so the client streams it without another copy
+                    for file in valid_files:
+                        file.seek(0)
                     filenames = [file.name for file in valid_files]
 
-                    response = api_client.upload_files(file_bytes, filenames)
+                    response = api_client.upload_files(valid_files, filenames)
 
                     st.success("✅ Files uploaded successfully!")
                     st.json(response)
+                    uploaded_hashes.update(valid_hashes)
 
                     # Refresh the page to update file count
+                    cached_uploaded_files.clear()
                     st.rerun()
 
                 except Exception as e:
@@ -81,7 +99,7 @@ def render_file_uploader():
     st.markdown("### Currently Uploaded Files")
 
     try:
-        files_response = api_client.get_uploaded_files()
+        files_response = cached_uploaded_files(api_client.base_url)
         files = files_response.get("files", [])
 
         if files:
@@ -18,12 +18,22 @@ class Config:
 
     # Request Configuration
     REQUEST_TIMEOUT = 60  # seconds
+    HEALTH_CHECK_TIMEOUT = 2  # seconds; bounds how long the sidebar can block
+    HEALTH_CHECK_TTL = 5  # seconds a health result is reused across reruns
+    FILE_LIST_TTL = 30  # seconds the uploaded file listing is reused across reruns
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = [".pdf"]
+    UPLOAD_BATCH_SIZE = 8  # files per upload request; larger selections are split
+    UPLOAD_CONCURRENCY = 4  # upload requests in flight at once
 
     # UI Configuration
     MAX_CHAT_HISTORY = 10
     MAX_SOURCES_DISPLAY = 3
+    CHAT_HISTORY_WINDOW = 40  # messages rendered per rerun; older ones load on request
+    SOURCES_RECENT_MESSAGES = 5  # only the latest messages get a sources toggle
+    ANSWER_CACHE_MAX_ENTRIES = 128  # repeated questions answered without a backend call
+    ANSWER_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "answers.sqlite3")
+    ANSWER_CACHE_TTL = 24 * 3600  # seconds a stored answer survives reloads and restarts
 
 # Global config instance
 config = Config()
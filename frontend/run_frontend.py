@@ -3,6 +3,7 @@
 Script to run the PDF RAG Chatbot Frontend
 """
 
+import hashlib
 import subprocess
 import sys
 import os
@@ -13,11 +14,18 @@ def main():
     frontend_dir = Path(__file__).parent
     os.chdir(frontend_dir)
 
-    # Install requirements if needed
+    # Install requirements only when they (or the interpreter) changed since the last install
     requirements_file = frontend_dir / "requirements.txt"
     if requirements_file.exists():
-        print("📦 Installing requirements...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], check=True)
+        stamp_file = frontend_dir / ".cache" / "requirements.sha256"
+        requirements_hash = hashlib.sha256(sys.executable.encode() + requirements_file.read_bytes()).hexdigest()
+        if not stamp_file.exists() or stamp_file.read_text().strip() != requirements_hash:
+            print("📦 Installing requirements...")
+            subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], check=True)
+            stamp_file.parent.mkdir(exist_ok=True)
+            stamp_file.write_text(requirements_hash)
+        else:
+            print("📦 Requirements unchanged, skipping install")
 
     # Run Streamlit
     print("🚀 Starting PDF RAG Chatbot Frontend...")
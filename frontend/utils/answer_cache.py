@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants match"""
+    return WHITESPACE_PATTERN.sub(" ", PUNCTUATION_PATTERN.sub("", query.lower())).strip()
+
+def corpus_versions(files_response: Dict[str, Any]) -> List[str]:
+    """
+    One identifier per uploaded file from an /api/files response, built from
+    the S3 key, ETag and last-modified time so re-uploading a file under the
+    same name still changes it. Falls back to the bare keys for backends that
+    do not report versions.
+    """
+    versions = files_response.get("versions")
+    if versions is None:
+        return list(files_response.get("files", []))
+    return [f"{version['key']}:{version['etag']}:{version['last_modified']}" for version in versions]
+
+class AnswerCache:
+    """
+    LRU of chat answers keyed by session and normalized query, so a repeated
+    question is answered without another round-trip to the backend.
+
+    Recent answers are held in memory; with a path, every answer is also kept
+    in SQLite for ttl_seconds so the cache survives page reloads and frontend
+    restarts. The cache remembers which set of uploaded files its answers were
+    built from and empties itself when that set changes. Reruns run on
+    different script threads, so all access goes through a lock.
+    """
+
+    def __init__(self, max_entries: int = 128, path: Optional[str] = None,
+                 ttl_seconds: float = 24 * 3600, max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._corpus: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS answers ("
+                    "key TEXT PRIMARY KEY, corpus TEXT NOT NULL, answer TEXT NOT NULL, created REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def _key(session_id: str, query: str) -> str:
+        return f"{session_id}:{normalize_query(query)}"
+
+    def sync_corpus(self, files: Iterable[str]) -> None:
+        """
+        Drop every answer if the uploaded files differ from the last call.
+        Each entry should change whenever its file's content does (see
+        corpus_versions), not just name the file.
+        """
+        corpus = hashlib.sha256("\n".join(sorted(files)).encode("utf-8")).hexdigest()
+        with self._lock:
+            if corpus == self._corpus:
+                return
+            self._entries.clear()
+            self._corpus = corpus
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM answers WHERE corpus != ?", (corpus,))
+
+    def get(self, session_id: str, query: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for this session's query, or None"""
+        key = self._key(session_id, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT answer FROM answers WHERE key = ? AND corpus = ? AND created > ?",
+                    (key, self._corpus or "", time.time() - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    entry = json.loads(row[0])
+                    self._remember(key, entry)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, session_id: str, query: str, answer: Dict[str, Any]) -> None:
+        """Store an answer, evicting the least recently used one when full"""
+        key = self._key(session_id, query)
+        with self._lock:
+            self._remember(key, answer)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO answers (key, corpus, answer, created) VALUES (?, ?, ?, ?)",
+                        (key, self._corpus or "", json.dumps(answer), time.time())
+                    )
+                    self._conn.execute(
+                        "DELETE FROM answers WHERE rowid <= (SELECT MAX(rowid) FROM answers) - ?",
+                        (self.max_disk_entries,)
+                    )
+
+    def _remember(self, key: str, answer: Dict[str, Any]) -> None:
+        """Insert into the in-memory LRU; the caller holds the lock"""
+        self._entries[key] = answer
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counts and sizes for display"""
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] if self._conn is not None else len(self._entries)
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_memory": len(self._entries),
+                "stored": stored
+            }
+
+    def clear(self) -> None:
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM answers")
@@ -1,13 +1,29 @@
 import streamlit as st
 from typing import Any, Dict
+from api_client import get_api_client
+from utils.answer_cache import AnswerCache
+from config import config
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
     for unit in ['B', 'KB', 'MB', 'GB']:
         if size_bytes < 1024.0:
-            return ".1f"
+            return f"{size_bytes:.1f}{unit}"
         size_bytes /= 1024.0
-    return ".1f"
+    return f"{size_bytes:.1f}TB"
+
+@st.cache_data(ttl=config.FILE_LIST_TTL, show_spinner=False)
+def cached_uploaded_files(base_url: str) -> Dict[str, Any]:
+    """
+    Uploaded file listing, shared by every component and reused across reruns.
+    Call cached_uploaded_files.clear() after uploads, deletes and resets.
+    """
+    return get_api_client().get_uploaded_files()
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Answer cache shared by every browser session of this frontend process"""
+    return AnswerCache(config.ANSWER_CACHE_MAX_ENTRIES, config.ANSWER_CACHE_PATH, config.ANSWER_CACHE_TTL)
 
 def display_api_response(response: Dict[str, Any], title: str = "API Response"):
     """Display API response in a formatted way"""
@@ -19,9 +35,11 @@ def validate_pdf_file(file) -> bool:
     if file.type != "application/pdf":
         return False
 
-    # Check file signature (PDF files start with %PDF-)
-    file_content = file.getvalue()
-    if not file_content.startswith(b'%PDF-'):
+    # Check file signature (PDF files start with %PDF-); only the header is read
+    file.seek(0)
+    header = file.read(5)
+    file.seek(0)
+    if header != b'%PDF-':
         return False
 
     return True
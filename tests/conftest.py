@@ -0,0 +1,5 @@
+import os
+
+# The app reads its API keys at import time; tests never reach the services
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
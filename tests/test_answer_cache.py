@@ -0,0 +1,56 @@
+from frontend.utils.answer_cache import AnswerCache, corpus_versions, normalize_query
+
+
+def test_trivial_query_variants_share_an_entry():
+    assert normalize_query("  What is RAG?? ") == normalize_query("what is rag")
+
+    cache = AnswerCache()
+    cache.put("session", "What is RAG?", {"answer": "retrieval"})
+    assert cache.get("session", "what is  rag") == {"answer": "retrieval"}
+    assert cache.get("other session", "what is rag") is None
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.put("s", "one", {"answer": 1})
+    cache.put("s", "two", {"answer": 2})
+    cache.get("s", "one")
+    cache.put("s", "three", {"answer": 3})
+
+    assert cache.get("s", "two") is None
+    assert cache.get("s", "one") == {"answer": 1}
+
+
+def test_answers_persist_and_are_dropped_when_files_change(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(path=path)
+    cache.sync_corpus(["a.pdf"])
+    cache.put("s", "question", {"answer": "cached"})
+
+    reopened = AnswerCache(path=path)
+    reopened.sync_corpus(["a.pdf"])
+    assert reopened.get("s", "question") == {"answer": "cached"}
+
+    reopened.sync_corpus(["a.pdf", "b.pdf"])
+    assert reopened.get("s", "question") is None
+
+
+def test_reuploading_a_file_changes_its_corpus_version():
+    def listing(etag, last_modified):
+        return {"files": ["storage_01/a.pdf"], "versions": [
+            {"key": "storage_01/a.pdf", "etag": etag, "size": 10, "last_modified": last_modified}
+        ]}
+
+    cache = AnswerCache()
+    cache.sync_corpus(corpus_versions(listing("e1", "2026-10-15T08:00:00+00:00")))
+    cache.put("s", "question", {"answer": "old"})
+
+    cache.sync_corpus(corpus_versions(listing("e1", "2026-10-15T08:00:00+00:00")))
+    assert cache.get("s", "question") == {"answer": "old"}
+
+    cache.sync_corpus(corpus_versions(listing("e2", "2026-10-15T09:00:00+00:00")))
+    assert cache.get("s", "question") is None
+
+
+def test_corpus_versions_fall_back_to_keys():
+    assert corpus_versions({"files": ["storage_01/a.pdf"]}) == ["storage_01/a.pdf"]
@@ -0,0 +1,28 @@
+from app.utils import cleanup
+
+
+def test_only_non_empty_directories_are_removed(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "a.pdf").write_bytes(b"%PDF-")
+    empty = tmp_path / "index"
+    empty.mkdir()
+    monkeypatch.setattr(cleanup, "CLEANUP_DIRS", (
+        ("PDF uploads", str(uploads)),
+        ("Index", str(empty)),
+        ("ChromaDB", str(tmp_path / "missing")),
+    ))
+
+    assert cleanup.cleanup_all_data() is True
+    assert not uploads.exists()
+    assert empty.exists()
+
+
+def test_nothing_to_remove_starts_no_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(cleanup, "CLEANUP_DIRS", (("PDF uploads", str(tmp_path / "missing")),))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no executor expected")
+
+    monkeypatch.setattr(cleanup, "ThreadPoolExecutor", fail)
+    assert cleanup.cleanup_all_data() is True
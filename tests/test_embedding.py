@@ -0,0 +1,43 @@
+import asyncio
+from collections import OrderedDict
+
+import numpy as np
+
+from app.services.embedding import DiskEmbeddingCache, EmbeddingModel
+
+
+class FakeModel:
+    def __init__(self, dimension=768):
+        self.dimension = dimension
+        self.calls = 0
+
+    def embed_documents(self, texts, batch_size=None):
+        self.calls += 1
+        rng = np.random.default_rng(len(texts))
+        return [rng.normal(size=self.dimension).tolist() for _ in texts]
+
+
+def _embedder(path, model):
+    embedder = EmbeddingModel.__new__(EmbeddingModel)
+    embedder.model = model
+    embedder._cache = OrderedDict()
+    embedder._disk_cache = DiskEmbeddingCache(path, "test-model", max_entries=100)
+    return embedder
+
+
+def test_cache_hits_stay_close_to_the_original_embeddings(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    texts = ["first chunk", "second chunk", "first chunk"]
+    model = FakeModel()
+
+    original = asyncio.run(_embedder(path, model).aembed_documents_array(texts))
+    assert model.calls == 1
+    assert np.array_equal(original[0], original[2])
+
+    # A fresh process: served from the disk cache, not the model
+    reloaded = asyncio.run(_embedder(path, model).aembed_documents_array(texts))
+    assert model.calls == 1
+    assert reloaded.dtype == np.float32
+
+    cosine = np.sum(original * reloaded, axis=1) / (np.linalg.norm(original, axis=1) * np.linalg.norm(reloaded, axis=1))
+    assert np.all(1 - cosine < 1e-6)
@@ -0,0 +1,49 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf
+from starlette.datastructures import Headers, UploadFile
+
+from app.config import Config
+from app.routes import upload
+
+
+class FakeStorage:
+    def __init__(self):
+        self.keys = []
+
+    def save_upload(self, file, content_hash=None):
+        key = f"storage_01/{content_hash}.pdf"
+        self.keys.append(key)
+        return {"bucket": "bucket", "key": key}
+
+
+def _pdf_bytes() -> bytes:
+    with pymupdf.open() as pdf:
+        for page_number in range(3):
+            pdf.new_page().insert_text((72, 72), f"Page {page_number} explains how uploads are chunked and indexed.")
+        return pdf.tobytes()
+
+
+def test_ingest_removes_its_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHUNK_CACHE_DIR", str(tmp_path / "chunks"))
+    saved_paths = []
+    save_temp_pdf_file = upload.save_temp_pdf_file
+
+    async def recording_save(file):
+        saved = await save_temp_pdf_file(file)
+        saved_paths.append(saved["file_path"])
+        return saved
+
+    monkeypatch.setattr(upload, "save_temp_pdf_file", recording_save)
+    storage = FakeStorage()
+    file = UploadFile(io.BytesIO(_pdf_bytes()), filename="doc.pdf", headers=Headers({"content-type": "application/pdf"}))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        texts, metadatas = asyncio.run(upload._ingest_one(file, storage, pool, asyncio.Semaphore(1)))
+
+    assert texts
+    assert {metadata["s3_key"] for metadata in metadatas} == set(storage.keys)
+    assert saved_paths and not any(os.path.exists(path) for path in saved_paths)
@@ -0,0 +1,53 @@
+import pymupdf
+import pytest
+
+from app.config import Config
+from app.services import pdf_loader
+from app.services.pdf_loader import page_ranges, parse_and_chunk
+
+PARAGRAPH = (
+    "Section {page}.{n} describes how uploaded documents are parsed, split into "
+    "token-bounded chunks, embedded and written to the vector index for retrieval. "
+)
+
+
+@pytest.fixture
+def pdf_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CHUNK_CACHE_DIR", str(tmp_path / "chunks"))
+    path = tmp_path / "sample.pdf"
+    with pymupdf.open() as pdf:
+        for page_number in range(12):
+            page = pdf.new_page()
+            text = "\n\n".join(PARAGRAPH.format(page=page_number, n=n) * 3 for n in range(4))
+            page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=9)
+        pdf.save(path)
+    return str(path)
+
+
+def test_page_ranges_are_even_and_cover_the_document():
+    assert page_ranges(40, 50) == [None]
+    assert page_ranges(60, 50) == [(0, 30), (30, 60)]
+    ranges = page_ranges(101, 25)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 101
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert max(stop - start for start, stop in ranges) - min(stop - start for start, stop in ranges) <= 1
+
+
+def test_page_range_chunks_match_whole_document_chunks(pdf_path):
+    content_hash = pdf_loader._file_hash(pdf_path)
+    whole = parse_and_chunk(pdf_path, 64, 8)
+
+    ranged = [
+        chunk
+        for pages in page_ranges(pdf_loader.count_pages(pdf_path), 5)
+        for chunk in parse_and_chunk(pdf_path, 64, 8, pages, content_hash)
+    ]
+
+    assert len(whole) > 12
+    assert ranged == whole
+
+
+def test_cached_chunks_match_parsed_chunks(pdf_path):
+    parsed = parse_and_chunk(pdf_path, 64, 8, (2, 7))
+    cached = parse_and_chunk(pdf_path, 64, 8, (2, 7))
+    assert cached == parsed
@@ -0,0 +1,36 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.routes import chat
+
+
+class FakeStore:
+    def __init__(self, failures):
+        self.failures = failures
+
+    def get_query_index(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("pinecone unreachable")
+        return "index"
+
+
+def test_missing_index_is_created_and_registered(monkeypatch):
+    store = FakeStore(failures=1)
+    monkeypatch.setattr(chat, "get_vector_store", lambda: store)
+    app = SimpleNamespace(state=SimpleNamespace())
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(chat._get_pinecone_index(app))
+
+    assert asyncio.run(chat._get_pinecone_index(app)) == "index"
+    assert app.state.pinecone_index == "index"
+
+
+def test_registered_index_is_reused(monkeypatch):
+    monkeypatch.setattr(chat, "get_vector_store", lambda: FakeStore(failures=0))
+    app = SimpleNamespace(state=SimpleNamespace(pinecone_index="startup index"))
+
+    assert asyncio.run(chat._get_pinecone_index(app)) == "startup index"
@@ -0,0 +1,34 @@
+from app.services.pinecone_store import PineconeVectorStoreHandler
+
+
+class FakeIndex:
+    def __init__(self, ids):
+        self.ids = ids
+        self.deletes = []
+
+    def list(self, prefix, namespace):
+        yield [vector_id for vector_id in self.ids if vector_id.startswith(prefix)]
+
+    def delete(self, **kwargs):
+        self.deletes.append(kwargs)
+
+
+def _handler(index):
+    handler = PineconeVectorStoreHandler.__new__(PineconeVectorStoreHandler)
+    handler.namespace = "default"
+    handler.get_index = lambda: index
+    return handler
+
+
+def test_prefixed_vectors_are_deleted_by_id():
+    index = FakeIndex(["storage_01/abc.pdf#0", "storage_01/abc.pdf#1", "storage_01/def.pdf#0"])
+
+    assert _handler(index).delete_vectors_by_s3_key("storage_01/abc.pdf") == 2
+    assert index.deletes == [{"ids": ["storage_01/abc.pdf#0", "storage_01/abc.pdf#1"], "namespace": "default"}]
+
+
+def test_legacy_vectors_are_deleted_by_metadata():
+    index = FakeIndex(["report.pdf_0", "report.pdf_1"])
+
+    assert _handler(index).delete_vectors_by_s3_key("storage_01/abc.pdf") == 0
+    assert index.deletes == [{"filter": {"s3_key": {"$eq": "storage_01/abc.pdf"}}, "namespace": "default"}]
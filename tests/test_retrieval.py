@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.routes import chat
+
+
+def _match(text, score):
+    return SimpleNamespace(score=score, metadata={"text": text, "file_name": f"{text}.pdf", "page_number": 1})
+
+
+def _retrieve(monkeypatch, matches, bm25_scores):
+    async def fake_aquery(index, **kwargs):
+        return SimpleNamespace(matches=matches)
+
+    monkeypatch.setattr(chat, "aquery", fake_aquery)
+    monkeypatch.setattr(chat.keyword_index, "score", lambda query, texts: bm25_scores)
+    return asyncio.run(chat.retrieve_context("query", [0.1, 0.2], index=None))
+
+
+def test_source_is_best_by_reciprocal_rank_fusion(monkeypatch):
+    # "b" is second semantically but first by keywords, so it wins the fused ranking
+    matches = [_match("a", 0.90), _match("b", 0.85), _match("c", 0.80)]
+    contexts, sources = _retrieve(monkeypatch, matches, [0.0, 2.0, 1.0])
+
+    assert contexts == ["a", "b", "c"]
+    assert [source.pdf_name for source in sources] == ["b.pdf"]
+
+
+def test_low_similarity_matches_need_keywords(monkeypatch):
+    matches = [_match("a", 0.90), _match("b", 0.50), _match("c", 0.40)]
+    contexts, sources = _retrieve(monkeypatch, matches, [0.0, 0.0, 1.5])
+
+    assert contexts == ["a", "c"]
+    assert [source.pdf_name for source in sources] == ["a.pdf"]
+
+
+def test_no_matches_returns_none(monkeypatch):
+    assert _retrieve(monkeypatch, [], []) is None
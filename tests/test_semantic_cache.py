@@ -0,0 +1,38 @@
+import time
+
+from app.services.semantic_cache import SemanticCache
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=4)
+    cache.put([1.0, 0.0, 0.0], "answer")
+
+    assert cache.get([10.0, 0.1, 0.0]) == "answer"
+    assert cache.get([0.0, 1.0, 0.0]) is None
+
+
+def test_expired_entries_never_hit(monkeypatch):
+    cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=4)
+    cache.put([1.0, 0.0], "answer")
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get([1.0, 0.0]) is None
+
+
+def test_oldest_entry_is_overwritten_when_full():
+    cache = SemanticCache(threshold=0.99, ttl_seconds=60, max_entries=2)
+    cache.put([1.0, 0.0, 0.0], "first")
+    cache.put([0.0, 1.0, 0.0], "second")
+    cache.put([0.0, 0.0, 1.0], "third")
+
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    assert cache.get([0.0, 1.0, 0.0]) == "second"
+    assert cache.get([0.0, 0.0, 1.0]) == "third"
+
+
+def test_clear_drops_everything():
+    cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=4)
+    cache.put([1.0, 0.0], "answer")
+    cache.clear()
+    assert cache.get([1.0, 0.0]) is None
@@ -0,0 +1,93 @@
+import asyncio
+
+from app.routes import chat
+
+
+def test_concurrent_callers_share_one_run():
+    calls = 0
+
+    async def produce():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(chat._single_flight("key", produce) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["answer"] * 3
+    assert calls == 1
+    assert chat.inflight_chats == {}
+
+
+def test_leader_cancellation_does_not_cancel_joiners():
+    calls = 0
+
+    async def main():
+        nonlocal calls
+        started = asyncio.Event()
+        gate = asyncio.Event()
+
+        async def produce():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await gate.wait()
+            return f"answer {calls}"
+
+        leader = asyncio.create_task(chat._single_flight("key", produce))
+        await started.wait()
+        joiners = [asyncio.create_task(chat._single_flight("key", produce)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        started.clear()
+        leader.cancel()
+        # A joiner takes over and runs produce() again; the other joins it
+        await started.wait()
+        await asyncio.sleep(0)
+        gate.set()
+
+        results = await asyncio.gather(*joiners)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(main()) == ["answer 2", "answer 2"]
+    assert calls == 2
+    assert chat.inflight_chats == {}
+
+
+def test_joiner_cancellation_propagates():
+    async def main():
+        gate = asyncio.Event()
+
+        async def produce():
+            await gate.wait()
+            return "answer"
+
+        leader = asyncio.create_task(chat._single_flight("key", produce))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(chat._single_flight("key", produce))
+        await asyncio.sleep(0)
+
+        joiner.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return await leader, joiner.cancelled()
+
+    assert asyncio.run(main()) == ("answer", True)
+    assert chat.inflight_chats == {}
+
+
+def test_leader_error_reaches_joiners():
+    async def main():
+        async def produce():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(
+            *(chat._single_flight("key", produce) for _ in range(2)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert chat.inflight_chats == {}
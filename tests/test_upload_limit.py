@@ -0,0 +1,22 @@
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app.main import app
+
+# Not used as a context manager, so the startup handlers (S3, Pinecone) never run
+client = TestClient(app)
+
+
+def test_oversized_upload_is_rejected_before_the_body_is_read():
+    response = client.post(
+        "/api/upload",
+        content=b"",
+        headers={"content-length": str(Config.MAX_UPLOAD_REQUEST_BYTES + 1)}
+    )
+    assert response.status_code == 413
+
+
+def test_other_requests_pass_through():
+    response = client.get("/health", headers={"content-length": str(Config.MAX_UPLOAD_REQUEST_BYTES + 1)})
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}